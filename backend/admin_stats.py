@@ -0,0 +1,96 @@
+# admin_stats.py
+# Admin dashboard istatistikleri: view her istekte tabloları taramasın diye
+# sweeper periyodik olarak admin_stats_history'ye görüntü yazar, endpoint en sonuncuyu
+# kısa TTL'li cache üzerinden okur. Yanıtta görüntünün zamanı (computed_at) ve bayatlığı döner.
+import os
+import time
+
+from sqlalchemy import text
+
+from cache import TTLCache
+from database import SessionLocal
+
+# Görüntü kaç saniyede bir yenilensin (sweeper döngüsünde kontrol edilir)
+ADMIN_STATS_REFRESH_INTERVAL = float(os.getenv("ADMIN_STATS_REFRESH_INTERVAL", "60"))
+# Görüntü bundan daha eskiyse (sweeper kapalı / durmuş) view'dan canlı okunur
+ADMIN_STATS_MAX_AGE = float(os.getenv("ADMIN_STATS_MAX_AGE", "300"))
+
+stats_cache = TTLCache(maxsize=4, ttl=float(os.getenv("ADMIN_STATS_CACHE_TTL", "10")))
+
+LATEST_SNAPSHOT_QUERY = text("""
+    SELECT computed_at, active_reservations, available_spots, average_site_rating, total_students,
+           EXTRACT(EPOCH FROM (NOW()::TIMESTAMP - computed_at)) AS age_seconds
+    FROM admin_stats_history
+    ORDER BY bucket DESC
+    LIMIT 1
+""")
+
+LIVE_QUERY = text("""
+    SELECT NOW()::TIMESTAMP AS computed_at, active_reservations, available_spots, average_site_rating,
+           total_students, 0 AS age_seconds
+    FROM admin_dashboard_stats
+""")
+
+HISTORY_QUERY = text("""
+    SELECT bucket, computed_at, active_reservations, available_spots, average_site_rating, total_students
+    FROM admin_stats_history
+    WHERE bucket >= date_trunc('hour', NOW()) - make_interval(hours => :hours)
+    ORDER BY bucket
+""")
+
+_last_refresh = 0.0
+
+
+def refresh_admin_stats():
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT refresh_admin_stats()"))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Admin stats yenilenemedi: {e}")
+    finally:
+        db.close()
+
+
+def maybe_refresh_admin_stats():
+    # Sweeper döngüsünden çağrılır; aralık dolmadıysa bir şey yapmaz
+    global _last_refresh
+    if time.monotonic() - _last_refresh >= ADMIN_STATS_REFRESH_INTERVAL:
+        refresh_admin_stats()
+        _last_refresh = time.monotonic()
+
+
+def snapshot_to_dict(row) -> dict:
+    return {
+        "active_reservations": row.active_reservations,
+        "available_spots": row.available_spots,
+        "average_site_rating": float(row.average_site_rating),  # Decimal hatası olmasın diye float yap
+        "total_students": row.total_students,
+        "computed_at": row.computed_at.isoformat(),
+    }
+
+
+def get_admin_stats(db) -> dict:
+    cached = stats_cache.get("current")
+    if cached is None:
+        row = db.execute(LATEST_SNAPSHOT_QUERY).fetchone()
+        if row is None or row.age_seconds > ADMIN_STATS_MAX_AGE:
+            row = db.execute(LIVE_QUERY).fetchone()
+        cached = (snapshot_to_dict(row), float(row.age_seconds), time.monotonic())
+        stats_cache.set("current", cached)
+    stats, age, fetched_at = cached
+    # Bayatlık yanıt anında hesaplanır (cache'te beklenen süre de eklenir)
+    return {**stats, "stale_seconds": round(age + time.monotonic() - fetched_at, 1)}
+
+
+def get_admin_stats_history(db, hours: int) -> list:
+    rows = db.execute(HISTORY_QUERY, {"hours": hours}).fetchall()
+    return [{
+        "bucket": r.bucket.isoformat(),
+        "active_reservations": r.active_reservations,
+        "available_spots": r.available_spots,
+        "average_site_rating": float(r.average_site_rating),
+        "total_students": r.total_students,
+        "computed_at": r.computed_at.isoformat(),
+    } for r in rows]
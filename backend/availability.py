@@ -0,0 +1,78 @@
+# availability.py
+# Bir mekanın tüm gününü koltuk x zaman dilimi doluluk matrisine çeviren yardımcılar.
+# SpotDetail'in her saat aralığı için ayrı /occupied çağırması yerine tek istekte tüm gün.
+import base64
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+# Tek sorguda hem kapasite hem o güne değen (İPTAL olmayan) rezervasyonlar
+# start_time alt sınırı: rezervasyon en fazla 24 saat sürer -> eski aylar partition pruning ile elenir
+DAY_RESERVATIONS_QUERY = text("""
+    SELECT s.capacity, r.seat_number, r.start_time, r.end_time
+    FROM study_spots s
+    LEFT JOIN reservations r
+           ON r.spot_id = s.spot_id
+          AND r.status <> 'İPTAL'
+          AND r.start_time < :day_end
+          AND r.start_time > CAST(:day_start AS TIMESTAMP) - INTERVAL '24 hours'
+          AND r.end_time > :day_start
+    WHERE s.spot_id = :sid
+""")
+
+MIN_SLOT_MINUTES = 5
+MAX_SLOT_MINUTES = 240
+
+
+def parse_slot(slot: str) -> int:
+    """'30m', '15m', '1h' -> dakika. Hatalıysa ValueError."""
+    match = re.fullmatch(r"(\d+)\s*([mh])", slot.strip().lower())
+    if not match:
+        raise ValueError("slot formatı '30m' veya '1h' gibi olmalı.")
+    minutes = int(match.group(1)) * (60 if match.group(2) == "h" else 1)
+    if not MIN_SLOT_MINUTES <= minutes <= MAX_SLOT_MINUTES:
+        raise ValueError(f"slot {MIN_SLOT_MINUTES} ile {MAX_SLOT_MINUTES} dakika arasında olmalı.")
+    return minutes
+
+
+def occupancy_grid(capacity: int, intervals, day_start: datetime, slot_minutes: int) -> np.ndarray:
+    """
+    intervals: (seat_number, start_time, end_time) listesi
+    Döner: (capacity x slot_sayısı) bool matris, True = dolu.
+    Fark dizisi (difference array) ile boyama: her rezervasyon başlangıç diliminde +1,
+    bitiş diliminde -1; satır bazında cumsum > 0 olan dilimler dolu. Dilim başına Python döngüsü yok.
+    """
+    n_slots = -(-24 * 60 // slot_minutes)  # ceil
+    grid = np.zeros((capacity, n_slots), dtype=bool)
+    if not intervals:
+        return grid
+
+    seats = np.fromiter((i[0] for i in intervals), dtype=np.int64, count=len(intervals))
+    base = np.datetime64(day_start, "m")
+    starts = (np.array([i[1] for i in intervals], dtype="datetime64[m]") - base).astype(np.int64)
+    ends = (np.array([i[2] for i in intervals], dtype="datetime64[m]") - base).astype(np.int64)
+
+    # Kapasite dışı koltuk numaralarını at, dakikaları dilim indekslerine çevir (yarım dilim de dolu sayılır)
+    valid = (seats >= 1) & (seats <= capacity)
+    rows = seats[valid] - 1
+    first = np.clip(starts[valid] // slot_minutes, 0, n_slots)
+    last = np.clip(-(-ends[valid] // slot_minutes), 0, n_slots)
+
+    diff = np.zeros((capacity, n_slots + 1), dtype=np.int32)
+    np.add.at(diff, (rows, first), 1)
+    np.add.at(diff, (rows, last), -1)
+    grid[:] = np.cumsum(diff, axis=1)[:, :n_slots] > 0
+    return grid
+
+
+def encode_grid(grid: np.ndarray) -> dict:
+    """Her koltuk için bitset (MSB önce, 1 = dolu) -> base64. 48 dilim = 6 byte = 8 karakter."""
+    packed = np.packbits(grid, axis=1)
+    return {str(seat + 1): base64.b64encode(packed[seat].tobytes()).decode() for seat in range(grid.shape[0])}
+
+
+def day_bounds(day):
+    day_start = datetime.combine(day, datetime.min.time())
+    return day_start, day_start + timedelta(days=1)
@@ -0,0 +1,271 @@
+# bench.py
+# Yük testi / benchmark aracı. Yerel Postgres + çalışan API (uvicorn) üzerinde kullanılır.
+#   python bench.py seed --users 50000 --spots 500 --reservations 5000000
+#   python bench.py run --base-url http://localhost:8000 --concurrency 32 --duration 60 --out sonuc.json
+#   python bench.py compare onceki.json sonraki.json
+# Not: seed sonrası API yeniden başlatılmalı (koltuk indeksi ve önbellekler açılışta yüklenir).
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from datagen import generate
+
+# Varsayılan endpoint karışımı (ağırlıklar): okuma ağırlıklı, gerçek kullanıma yakın
+DEFAULT_MIX = {
+    "spots": 30,
+    "occupied": 30,
+    "my-history": 20,
+    "create": 10,
+    "admin-reservations": 5,
+    "admin-users": 5,
+}
+
+
+# --- SEED ---
+def seed(args):
+    # Veri üretimi datagen.py'de (COPY ile akıtarak yükler)
+    started = time.perf_counter()
+    generate(args.users, args.spots, args.reservations, args.reviews, args.seed, truncate=args.truncate)
+    print(f"Seed tamamlandı: {time.perf_counter() - started:.1f} sn")
+
+
+# --- RUN ---
+class Workload:
+    """Rastgele ama tekrarlanabilir (seed'li) istek üretici."""
+
+    def __init__(self, db, seed: int):
+        self.rng = random.Random(seed)
+        self.user_ids = [r[0] for r in db.execute(text(
+            "SELECT user_id FROM users WHERE role = 'STUDENT' ORDER BY user_id"
+        ))]
+        self.spots = [tuple(r) for r in db.execute(text(
+            "SELECT spot_id, capacity FROM study_spots WHERE is_available = TRUE ORDER BY spot_id"
+        ))]
+        if not self.user_ids or not self.spots:
+            raise SystemExit("Veritabanında kullanıcı/mekan yok. Önce: python bench.py seed")
+
+    def _slot(self, days_ahead: int):
+        day = datetime.now().date() + timedelta(days=self.rng.randint(0, days_ahead))
+        hour = self.rng.randint(8, 21)
+        return day, hour
+
+    def request(self, name: str):
+        """(method, path, params, json) döner."""
+        rng = self.rng
+        if name == "spots":
+            return "GET", "/api/spots", None, None
+        if name == "occupied":
+            spot_id, _ = rng.choice(self.spots)
+            day, hour = self._slot(7)
+            params = {"date": day.isoformat(), "start": f"{hour:02d}:00", "end": f"{hour + 1:02d}:00"}
+            return "GET", f"/api/spots/{spot_id}/occupied", params, None
+        if name == "my-history":
+            return "GET", "/api/my-history", {"user_id": rng.choice(self.user_ids)}, None
+        if name == "create":
+            spot_id, capacity = rng.choice(self.spots)
+            # Uzak gelecekte rastgele yuva: çakışma (409) da gerçekçi bir sonuç
+            day, hour = self._slot(365)
+            body = {
+                "userId": rng.choice(self.user_ids), "spotId": spot_id,
+                "seatNumber": rng.randint(1, capacity),
+                "start": f"{day.isoformat()}T{hour:02d}:00", "end": f"{day.isoformat()}T{hour + 1:02d}:00",
+            }
+            return "POST", "/api/reservations/create", None, body
+        if name == "admin-reservations":
+            return "GET", "/api/admin/reservations", {"limit": 50}, None
+        if name == "admin-users":
+            return "GET", "/api/admin/users", {"limit": 50}, None
+        raise ValueError(f"Bilinmeyen endpoint: {name}")
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Bilinmeyen endpoint(ler): {', '.join(sorted(unknown))}")
+    return mix
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples, elapsed: float) -> dict:
+    latencies = sorted(s[1] for s in samples)
+    statuses = {}
+    for s in samples:
+        statuses[str(s[2])] = statuses.get(str(s[2]), 0) + 1
+    errors = sum(1 for s in samples if s[2] == "error" or (isinstance(s[2], int) and s[2] >= 500))
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "status_counts": statuses,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0,
+    }
+
+
+async def drive(args, workload: Workload, mix: dict, duration: float, record: bool):
+    import httpx
+
+    names, weights = list(mix), list(mix.values())
+    samples = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                name = workload.rng.choices(names, weights)[0]
+                method, path, params, body = workload.request(name)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, params=params, json=body)
+                    outcome = response.status_code
+                except httpx.HTTPError:
+                    outcome = "error"
+                if record:
+                    samples.append((name, (time.perf_counter() - started) * 1000, outcome))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    mix = args.mix or DEFAULT_MIX
+    db = SessionLocal()
+    try:
+        workload = Workload(db, args.seed)
+        dataset = dict(db.execute(text("""
+            SELECT 'users', COUNT(*) FROM users UNION ALL
+            SELECT 'study_spots', COUNT(*) FROM study_spots UNION ALL
+            SELECT 'reservations', COUNT(*) FROM reservations UNION ALL
+            SELECT 'reviews', COUNT(*) FROM reviews
+        """)).all())
+    finally:
+        db.close()
+
+    if args.warmup > 0:
+        print(f"Isınma: {args.warmup} sn")
+        asyncio.run(drive(args, workload, mix, args.warmup, record=False))
+    print(f"Ölçüm: {args.duration} sn, eşzamanlılık {args.concurrency}")
+    samples, elapsed = asyncio.run(drive(args, workload, mix, args.duration, record=True))
+
+    by_endpoint = {}
+    for s in samples:
+        by_endpoint.setdefault(s[0], []).append(s)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "mix": mix,
+            "dataset": dataset,
+        },
+        "total": summarize(samples, elapsed),
+        "endpoints": {name: summarize(items, elapsed) for name, items in sorted(by_endpoint.items())},
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_table(report)
+    print(f"Sonuç yazıldı: {args.out}")
+
+
+def print_table(report):
+    print(f"{'endpoint':<20}{'istek':>8}{'hata':>6}{'rps':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    rows = list(report["endpoints"].items()) + [("TOPLAM", report["total"])]
+    for name, r in rows:
+        print(f"{name:<20}{r['requests']:>8}{r['errors']:>6}{r['throughput_rps']:>10}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+
+
+# --- COMPARE ---
+def compare(args):
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    def delta(old, new):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+
+    print(f"{'endpoint':<20}{'metrik':<16}{'önce':>10}{'sonra':>10}{'fark':>9}")
+    names = sorted(set(before["endpoints"]) | set(after["endpoints"]))
+    for name in names + ["TOPLAM"]:
+        old = before["total"] if name == "TOPLAM" else before["endpoints"].get(name)
+        new = after["total"] if name == "TOPLAM" else after["endpoints"].get(name)
+        if not old or not new:
+            print(f"{name:<20}(sadece bir çalıştırmada var)")
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            print(f"{name:<20}{metric:<16}{old[metric]:>10}{new[metric]:>10}{delta(old[metric], new[metric]):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StudyFlow yük testi / benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="Benchmark veri setini yükler")
+    p_seed.add_argument("--users", type=int, default=50000)
+    p_seed.add_argument("--spots", type=int, default=500)
+    p_seed.add_argument("--reservations", type=int, default=5000000)
+    p_seed.add_argument("--reviews", type=int, default=100000)
+    p_seed.add_argument("--seed", type=int, default=42)
+    p_seed.add_argument("--truncate", action="store_true", help="Önce mevcut veriyi sil")
+    p_seed.set_defaults(func=seed)
+
+    p_run = sub.add_parser("run", help="Endpoint karışımını sabit eşzamanlılıkla çalıştırır")
+    p_run.add_argument("--base-url", default="http://localhost:8000")
+    p_run.add_argument("--concurrency", type=int, default=32)
+    p_run.add_argument("--duration", type=float, default=60)
+    p_run.add_argument("--warmup", type=float, default=5)
+    p_run.add_argument("--timeout", type=float, default=30)
+    p_run.add_argument("--mix", type=parse_mix, default=None,
+                       help="Örn: spots=30,occupied=30,my-history=20,create=10,admin-reservations=5,admin-users=5")
+    p_run.add_argument("--seed", type=int, default=42)
+    p_run.add_argument("--out", default="bench_result.json")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="İki sonuç dosyasını karşılaştırır")
+    p_cmp.add_argument("before")
+    p_cmp.add_argument("after")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
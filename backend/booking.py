@@ -0,0 +1,225 @@
+# booking.py
+# Rezervasyon yazma yolu yardımcıları.
+# - Tekli rezervasyon: koltuk bazlı kilit + sınırlı tekrar deneme (aynı koltuğa yarışan istekler sıraya girer,
+#   farklı koltuklar birbirini beklemez).
+# - Toplu / tekrarlayan rezervasyon: yüzlerce ayrı /reservations/create isteği yerine tek transaction, tek INSERT.
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from database import pg_error_code, note_write, WRITE_XID_COLUMN
+from metrics import Counter, register
+from seat_index import parse_ts
+
+# Tek istekte oluşturulabilecek en fazla rezervasyon
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+
+# Bir rezervasyonun en uzun süresi (setup.sql: chk_reservation_length ile aynı)
+MAX_RESERVATION_HOURS = 24
+
+# Koltuk kilidi alınamazsa en fazla kaç kez tekrar denensin, ilk bekleme (ms, her denemede 2 katı + jitter)
+SEAT_LOCK_RETRIES = int(os.getenv("SEAT_LOCK_RETRIES", "4"))
+SEAT_LOCK_BACKOFF_MS = float(os.getenv("SEAT_LOCK_BACKOFF_MS", "25"))
+# Toplu rezervasyonda koltuk kilitleri için en fazla bekleme
+BATCH_LOCK_TIMEOUT_MS = int(os.getenv("BATCH_LOCK_TIMEOUT_MS", "2000"))
+
+# Tekrar denenebilir SQLSTATE'ler: serialization_failure, deadlock_detected, lock_not_available
+RETRYABLE_SQLSTATES = {"40001", "40P01", "55P03"}
+
+BOOKING_OUTCOMES = register(Counter(
+    "studyflow_booking_outcomes_total", "Rezervasyon denemelerinin sonucu (created / taken / busy)",
+    ("path", "outcome")))
+SEAT_LOCK_CONTENTION = register(Counter(
+    "studyflow_seat_lock_contention_total",
+    "Koltuk kilidinin dolu bulunduğu denemeler (process: aynı worker, db: advisory lock)", ("scope",)))
+BOOKING_RETRIES = register(Counter(
+    "studyflow_booking_retries_total", "Tekrar denenen rezervasyon INSERT'leri (sebep bazında)", ("reason",)))
+
+# Kilit + INSERT tek round trip: (spot_id, seat_number) advisory lock'u alınamazsa satır eklenmez, boş döner.
+# Anahtar trg_cross_partition_overlap'in aldığı kilitle aynı; aynı transaction içinde tekrar alınabilir.
+# Kilit transaction sonunda (commit / rollback) kendiliğinden bırakılır.
+RESERVATION_INSERT_QUERY = text(f"""
+    INSERT INTO reservations (user_id, spot_id, start_time, end_time, seat_number, status)
+    SELECT CAST(:uid AS INT), CAST(:sid AS INT), CAST(:start AS TIMESTAMP), CAST(:end AS TIMESTAMP),
+           CAST(:seat AS INT), 'AKTİF'
+    WHERE pg_try_advisory_xact_lock(CAST(:sid AS INT), CAST(:seat AS INT))
+    RETURNING reservation_id, {WRITE_XID_COLUMN}
+""")
+
+# Toplu rezervasyon: tüm koltukların kilidi sabit sırayla (deadlock olmasın) beklenerek alınır
+BATCH_SEAT_LOCK_QUERY = text("""
+    SELECT pg_advisory_xact_lock(k.sid, k.seat)
+    FROM (
+        SELECT DISTINCT sid, seat FROM unnest(CAST(:sids AS INT[]), CAST(:seats AS INT[])) AS u(sid, seat)
+        ORDER BY sid, seat
+    ) k
+""")
+
+# Set-based çakışma kontrolü + çoklu satır INSERT tek ifadede:
+# unnest ile tüm adaylar tek seferde gönderilir, no_seat_overlap EXCLUSION CONSTRAINT'e takılanlar
+# ON CONFLICT DO NOTHING ile atlanır. RETURNING'de dönmeyen aday = çakışma.
+BATCH_INSERT_QUERY = text(f"""
+    INSERT INTO reservations (user_id, spot_id, seat_number, start_time, end_time, status)
+    SELECT c.uid, c.sid, c.seat, c.st, c.en, 'AKTİF'
+    FROM unnest(
+        CAST(:uids AS INT[]), CAST(:sids AS INT[]), CAST(:seats AS INT[]),
+        CAST(:starts AS TIMESTAMP[]), CAST(:ends AS TIMESTAMP[])
+    ) AS c(uid, sid, seat, st, en)
+    ON CONFLICT DO NOTHING
+    RETURNING reservation_id, spot_id, seat_number, start_time, end_time, {WRITE_XID_COLUMN}
+""")
+
+
+def _parse_clock(value: str):
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def expand_recurrence(rule):
+    """Kuralı (startDate'ten itibaren weeks hafta, seçili günler) tek tek aralıklara açar."""
+    first_day = datetime.strptime(rule.startDate, "%Y-%m-%d").date()
+    start_clock, end_clock = _parse_clock(rule.startTime), _parse_clock(rule.endTime)
+    weekdays = set(rule.weekdays)
+    for offset in range(rule.weeks * 7):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() in weekdays:
+            yield datetime.combine(day, start_clock), datetime.combine(day, end_clock)
+
+
+def expand_batch(batch):
+    """
+    İsteği aday listesine çevirir.
+    Döner: (adaylar, hatalı sonuçlar). Her aday: index, userId, spotId, seatNumber, start, end
+    """
+    candidates, invalid = [], []
+
+    def push(uid, sid, seat, start, end):
+        index = len(candidates) + len(invalid)
+        if start is None or end is None:
+            invalid.append({"index": index, "status": "invalid", "detail": "Geçersiz tarih formatı."})
+        elif end <= start:
+            invalid.append({"index": index, "status": "invalid",
+                            "detail": "Bitiş saati başlangıç saatinden sonra olmalı."})
+        elif end - start > timedelta(hours=MAX_RESERVATION_HOURS):
+            invalid.append({"index": index, "status": "invalid",
+                            "detail": f"Bir rezervasyon en fazla {MAX_RESERVATION_HOURS} saat olabilir."})
+        else:
+            candidates.append({"index": index, "userId": uid, "spotId": sid, "seatNumber": seat,
+                               "start": start, "end": end})
+
+    # Açmadan önce boyut kontrolü: weeks hafta boyunca her seçili gün tam weeks kez gelir
+    planned = len(batch.reservations) + (batch.recurrence.weeks * len(batch.recurrence.weekdays)
+                                         if batch.recurrence else 0)
+    if planned > MAX_BATCH_SIZE:
+        raise ValueError(f"Tek istekte en fazla {MAX_BATCH_SIZE} rezervasyon oluşturulabilir.")
+
+    for res in batch.reservations:
+        push(res.userId, res.spotId, res.seatNumber, parse_ts(res.start), parse_ts(res.end))
+
+    rule = batch.recurrence
+    if rule:
+        try:
+            slots = list(expand_recurrence(rule))
+        except ValueError:
+            raise ValueError("Tekrar kuralında tarih/saat formatı hatalı (YYYY-MM-DD, HH:MM).")
+        except OverflowError:
+            raise ValueError("Tekrar kuralı desteklenen tarih aralığının dışına taşıyor.")
+        for start, end in slots:
+            push(rule.userId, rule.spotId, rule.seatNumber, start, end)
+
+    return candidates, invalid
+
+
+def find_batch_overlaps(candidates):
+    """Aynı istek içindeki adayların kendi aralarında çakışanları (sonra gelenler) bulur."""
+    overlapping = set()
+    by_seat = {}
+    for c in candidates:
+        by_seat.setdefault((c["spotId"], c["seatNumber"]), []).append(c)
+    for items in by_seat.values():
+        items.sort(key=lambda c: c["start"])
+        max_end = None
+        for c in items:
+            if max_end is not None and c["start"] < max_end:
+                overlapping.add(c["index"])
+                continue
+            max_end = c["end"] if max_end is None else max(max_end, c["end"])
+    return overlapping
+
+
+class KeyedLocks:
+    """
+    Aynı worker içindeki eşzamanlı istekleri anahtar bazında sıraya sokar (asyncio.Lock).
+    Bekleyen kalmayınca kilit silinir; sözlük sadece o an yarışılan koltuklar kadar büyür.
+    """
+    def __init__(self):
+        self._locks = {}  # anahtar -> [asyncio.Lock, kullanan sayısı]
+
+    @asynccontextmanager
+    async def hold(self, key):
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        if entry[0].locked():
+            SEAT_LOCK_CONTENTION.inc(("process",))
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+
+seat_locks = KeyedLocks()
+
+
+def backoff_delay(attempt: int) -> float:
+    """attempt. tekrar öncesi bekleme (saniye): üstel artış + jitter (aynı anda düşen istekler dağılsın)."""
+    return SEAT_LOCK_BACKOFF_MS / 1000 * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+
+async def insert_reservation(db, params: dict):
+    """
+    RESERVATION_INSERT_QUERY'yi koltuk kilidi alınana kadar en fazla SEAT_LOCK_RETRIES kez tekrar dener.
+    Döner: reservation_id, koltuk hâlâ başka bir işlemdeyse None.
+    Tekrar denenemeyen hatalar (23P01 çakışma vb.) çağırana iletilir.
+    """
+    for attempt in range(SEAT_LOCK_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(backoff_delay(attempt))
+        try:
+            row = (await db.execute(RESERVATION_INSERT_QUERY, params)).fetchone()
+        except Exception as e:
+            code = pg_error_code(e)
+            if code not in RETRYABLE_SQLSTATES or attempt == SEAT_LOCK_RETRIES:
+                raise
+            await db.rollback()
+            BOOKING_RETRIES.inc((code,))
+            continue
+        if row is not None:
+            note_write(db, row)
+            return row.reservation_id
+        await db.rollback()
+        SEAT_LOCK_CONTENTION.inc(("db",))
+        if attempt < SEAT_LOCK_RETRIES:
+            BOOKING_RETRIES.inc(("lock_busy",))
+    return None
+
+
+def conflict_response(code: str, detail: str, retryable: bool = False, headers: dict = None, **extra):
+    """
+    Yapılandırılmış 409: frontend'in okuduğu "detail" aynen kalır, yanında makine tarafından okunabilir alanlar.
+    code: SEAT_TAKEN (koltuk dolu, başka koltuk/saat seçilmeli) / SEAT_BUSY (koltuk şu an işlemde, tekrar denenebilir)
+    """
+    headers = dict(headers or {})
+    if retryable:
+        headers["Retry-After"] = "1"
+    return JSONResponse(
+        status_code=409,
+        content={"detail": detail, "code": code, "retryable": retryable, **extra},
+        headers=headers
+    )
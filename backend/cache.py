@@ -0,0 +1,74 @@
+# cache.py
+# Uygulama içi (process-local) önbellek yardımcıları.
+# /api/spots gibi çok okunan, az değişen verileri her istekte DB'ye gitmeden sunmak için.
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    LRU tahliyeli + TTL (süre aşımı) destekli basit, thread-safe önbellek.
+    - maxsize dolunca en uzun süredir kullanılmayan kayıt atılır (LRU)
+    - ttl saniyeden eski kayıtlar okunurken geçersiz sayılır
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        # Yazma sonrası invalidate edildiğinde artar. Invalidate'den önce başlamış
+        # bir okumanın eski sonucu sonradan cache'e yazmasını engeller.
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation: int = None):
+        with self._lock:
+            # Bu arada invalidate olduysa bayat veriyi yazma
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Mekan kataloğu (/api/spots) önbelleği.
+# Anahtar: None -> tüm liste, "arama kelimesi" -> q araması sonucu
+# Değer: (etag, liste). Worker'a özel; diğer worker'ların yazmaları ETag ('spots' sürümü) karşılaştırmasıyla
+# yakalanır (bkz. main.get_spots), TTL sadece kullanılmayan aramaları bellekten atmak için.
+spots_cache = TTLCache(
+    maxsize=int(os.getenv("SPOTS_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("SPOTS_CACHE_TTL", "30")),
+)
+
+
+def invalidate_spots():
+    # Mekan, bakım durumu veya yorumlar değiştiğinde çağrılır (puan ortalaması da değişir).
+    # Sadece bu worker'ı temizler; diğerleri sürüm değişimini bir sonraki istekte görür.
+    spots_cache.invalidate()
@@ -0,0 +1,244 @@
+# cohorts.py
+# Admin kohort analizleri: "A veya B mekanını kullananlar", "A'yı kullanıp B'yi kullanmayanlar" vb.
+# Her mekan için o mekanda rezervasyonu olan kullanıcıların bitmap'i bellekte tutulur
+# (Python int: bit i = user_id i). Küme işlemleri bitmap'ler üzerinde |, &, & ~ ile yapılır;
+# yüzlerce mekanlı ifade bile DB'ye gitmeden mikrosaniyeler içinde hesaplanır.
+# Bitmap'ler ilk kullanımda DB'den (replika tanımlıysa replikadan) kurulur, rezervasyon yazmalarında artımlı
+# güncellenir, COHORT_INDEX_MAX_AGE saniyede bir (diğer worker'ların yazmaları için) baştan kurulur.
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from cache import TTLCache
+from database import ReadSessionLocal
+
+COHORT_INDEX_MAX_AGE = float(os.getenv("COHORT_INDEX_MAX_AGE", "300"))
+# Tek ifadede kullanılabilecek en fazla mekan
+MAX_COHORT_SPOTS = int(os.getenv("MAX_COHORT_SPOTS", "1000"))
+
+# Eski analiz sorguları gibi durumdan bağımsız: mekanda herhangi bir rezervasyonu olan kullanıcı
+LOAD_QUERY = text("""
+    SELECT spot_id, ARRAY_AGG(DISTINCT user_id) AS user_ids
+    FROM reservations_all
+    WHERE spot_id IS NOT NULL AND user_id IS NOT NULL
+    GROUP BY spot_id
+""")
+
+# İfade sonucu önbelleği (bitmap + adet). Bitmap'e yeni bit eklenince invalidate edilir.
+cohort_cache = TTLCache(maxsize=int(os.getenv("COHORT_CACHE_SIZE", "256")),
+                        ttl=float(os.getenv("COHORT_CACHE_TTL", "300")))
+
+
+def _bitmap(user_ids) -> int:
+    if not user_ids:
+        return 0
+    ids = np.asarray(user_ids, dtype=np.int64)
+    bits = np.zeros(int(ids.max()) + 1, dtype=np.uint8)
+    bits[ids] = 1
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+def bitmap_to_ids(bitmap: int) -> np.ndarray:
+    if bitmap == 0:
+        return np.zeros(0, dtype=np.int64)
+    raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+class CohortIndex:
+    def __init__(self):
+        self._bitmaps = {}      # spot_id -> int bitmap
+        self._loaded_at = None  # monotonic
+        self._pending = None    # yükleme sürerken gelen yazmalar (yükleme bitince yeni bitmap'lere uygulanır)
+        # _lock sadece bitmap/_pending erişiminde kısa süreli tutulur; rezervasyon endpoint'leri add() ile
+        # buna girer. Uzun LOAD_QUERY taraması _load_lock altında, _lock dışında çalışır (seat_index.load gibi).
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= COHORT_INDEX_MAX_AGE
+
+    def _ensure_loaded(self):
+        if not self._stale():
+            return
+        with self._load_lock:
+            if not self._stale():
+                return
+            with self._lock:
+                self._pending = []
+            try:
+                db = ReadSessionLocal()
+                try:
+                    rows = db.execute(LOAD_QUERY).fetchall()
+                finally:
+                    db.close()
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            bitmaps = {r.spot_id: _bitmap(r.user_ids) for r in rows}
+
+            with self._lock:
+                for op, spot_id, user_id in self._pending:
+                    if op == "add":
+                        bitmaps[spot_id] = bitmaps.get(spot_id, 0) | (1 << user_id)
+                    else:
+                        bitmaps.pop(spot_id, None)
+                self._bitmaps = bitmaps
+                self._pending = None
+                self._loaded_at = time.monotonic()
+                cohort_cache.invalidate()
+
+    def add(self, spot_id: int, user_id: int):
+        # Rezervasyon yazıldıktan sonra çağrılır. Henüz yüklenmediyse ilk kullanımda zaten DB'den kurulacak.
+        if spot_id is None or user_id is None:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("add", spot_id, user_id))
+            if self._loaded_at is None:
+                return
+            current = self._bitmaps.get(spot_id, 0)
+            updated = current | (1 << user_id)
+            if updated != current:
+                self._bitmaps[spot_id] = updated
+                cohort_cache.invalidate()
+
+    def drop_spot(self, spot_id: int):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("drop", spot_id, None))
+            if self._bitmaps.pop(spot_id, None) is not None:
+                cohort_cache.invalidate()
+
+    def get(self, spot_id: int) -> int:
+        return self._bitmaps.get(spot_id, 0)
+
+    def evaluate(self, expr: str):
+        """İfadeyi hesaplar. Döner: (normalize edilmiş ifade, sonuç bitmap'i, adet)."""
+        tree = parse_expression(expr)
+        key = render(tree)
+        self._ensure_loaded()
+        generation = cohort_cache.generation
+        cached = cohort_cache.get(key)
+        if cached is None:
+            bitmap = _eval(tree, self.get)
+            cached = (bitmap, bin(bitmap).count("1"))
+            cohort_cache.set(key, cached, generation)
+        return (key,) + cached
+
+
+cohort_index = CohortIndex()
+
+
+# --- İfade ayrıştırma ---
+# Dilbilgisi: mekan ID'leri, | (birleşim), & (kesişim), - (fark) ve parantez.
+# Öncelik: & önce, | ve - aynı seviyede soldan sağa. Örn: "1 | 2 - 3" = (1 | 2) - 3, "1 | 2 & 3" = 1 | (2 & 3)
+_TOKEN = re.compile(r"\s*(?:(\d+)|(.))")
+OPS = {"union": "|", "intersect": "&", "except": "-"}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def _tokenize(expr: str):
+    tokens = []
+    for number, symbol in _TOKEN.findall(expr.strip()):
+        if number:
+            tokens.append(int(number))
+        elif symbol in "|&-()":
+            tokens.append(symbol)
+        elif not symbol.isspace():
+            raise ExpressionError(f"Geçersiz karakter: '{symbol}'")
+    return tokens
+
+
+def parse_expression(expr: str):
+    tokens = _tokenize(expr)
+    if not tokens:
+        raise ExpressionError("Boş ifade.")
+    pos = 0
+    spots = set()
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def atom():
+        tok = peek()
+        if isinstance(tok, int):
+            take()
+            spots.add(tok)
+            return tok
+        if tok == "(":
+            take()
+            node = expression()
+            if peek() != ")":
+                raise ExpressionError("Kapanmayan parantez.")
+            take()
+            return node
+        raise ExpressionError("Mekan ID'si veya '(' bekleniyordu.")
+
+    def term():
+        node = atom()
+        while peek() == "&":
+            take()
+            node = ("&", node, atom())
+        return node
+
+    def expression():
+        node = term()
+        while peek() in ("|", "-"):
+            node = (take(), node, term())
+        return node
+
+    tree = expression()
+    if pos != len(tokens):
+        raise ExpressionError(f"Beklenmeyen ifade parçası: '{tokens[pos]}'")
+    if len(spots) > MAX_COHORT_SPOTS:
+        raise ExpressionError(f"Bir ifadede en fazla {MAX_COHORT_SPOTS} mekan kullanılabilir.")
+    return tree
+
+
+def build_expression(spot_ids, op: str) -> str:
+    """spot_ids=[1,2,3], op='except' -> '1 - 2 - 3' (ilk mekan, diğerlerinin hiçbiri)"""
+    if op not in OPS:
+        raise ExpressionError(f"op şunlardan biri olmalı: {', '.join(OPS)}")
+    if not spot_ids:
+        raise ExpressionError("En az bir mekan gerekli.")
+    return f" {OPS[op]} ".join(str(s) for s in spot_ids)
+
+
+def render(node) -> str:
+    if isinstance(node, int):
+        return str(node)
+    op, left, right = node
+    right_str = render(right)
+    # Sağ taraf aynı/alt öncelikte bir işlemse parantez şart (örn. 1 - (2 | 3))
+    if isinstance(right, tuple) and (op == "&" or right[0] != "&"):
+        right_str = f"({right_str})"
+    left_str = render(left)
+    if op == "&" and isinstance(left, tuple) and left[0] != "&":
+        left_str = f"({left_str})"
+    return f"{left_str} {op} {right_str}"
+
+
+def _eval(node, lookup) -> int:
+    if isinstance(node, int):
+        return lookup(node)
+    op, left, right = node
+    a, b = _eval(left, lookup), _eval(right, lookup)
+    if op == "|":
+        return a | b
+    if op == "&":
+        return a & b
+    return a & ~b
@@ -0,0 +1,155 @@
+# export.py
+# Admin raporlama için toplu veri dışa aktarma (CSV / NDJSON).
+# CSV: Postgres COPY (...) TO STDOUT ile satırlar DB'de CSV'ye çevrilir ve doğrudan akıtılır.
+# NDJSON: server-side cursor ile satır satır JSON üretilir.
+# İkisinde de tüm sonuç worker belleğine alınmaz. Büyük taramalar olduğu için replikadan okunur (varsa).
+# Akış yarıda hata alırsa hata generator'dan yükseltilir: yanıt 200 başlığıyla başlamış olsa da bağlantı
+# düzgün kapanmadan kesilir, istemci eksik dosyayı tam sanmaz.
+import json
+import queue
+import threading
+from datetime import timedelta
+
+from fastapi.responses import StreamingResponse
+
+from database import read_engine
+from metrics import Counter, register, logger
+from pagination import STREAM_BATCH_SIZE
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+EXPORT_FAILURES = register(Counter(
+    "studyflow_export_failures_total", "Hata yüzünden yarıda kesilen dışa aktarmalar", ("format",)))
+
+# Tabloların dışa aktarılan kolonları (kullanıcı adı ve mekan adı ile join'li)
+# Rezervasyonlar arşivlenmiş aylar dahil (reservations_all view'ı)
+# Not: psycopg2 paramstyle (%(isim)s) kullanılıyor, COPY için mogrify ile gömülüyor.
+RESERVATIONS_EXPORT_SQL = """
+    SELECT r.reservation_id, r.user_id, u.username, r.spot_id, s.name AS spot_name, r.seat_number,
+           r.start_time, r.end_time,
+           CASE WHEN r.status = 'AKTİF' AND r.end_time < NOW() THEN 'TAMAMLANDI' ELSE r.status END AS status,
+           r.has_reviewed, r.created_at
+    FROM reservations_all r
+    LEFT JOIN users u ON r.user_id = u.user_id
+    LEFT JOIN study_spots s ON r.spot_id = s.spot_id
+"""
+
+REVIEWS_EXPORT_SQL = """
+    SELECT rv.review_id, rv.user_id, u.username, rv.spot_id, s.name AS spot_name,
+           rv.rating, rv.comment, rv.created_at
+    FROM reviews rv
+    LEFT JOIN users u ON rv.user_id = u.user_id
+    LEFT JOIN study_spots s ON rv.spot_id = s.spot_id
+"""
+
+
+def build_export_query(base_sql: str, alias: str, time_column: str, order_column: str,
+                       spot_id=None, date_from=None, date_to=None):
+    where, params = [], {}
+    if spot_id:
+        where.append(f"{alias}.spot_id = %(spot_id)s")
+        params["spot_id"] = spot_id
+    if date_from:
+        where.append(f"{alias}.{time_column} >= %(date_from)s")
+        params["date_from"] = date_from
+    if date_to:
+        where.append(f"{alias}.{time_column} < %(date_to)s")
+        params["date_to"] = date_to + timedelta(days=1)
+    sql = base_sql
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {alias}.{order_column}"
+    return sql, params
+
+
+class _QueueWriter:
+    """copy_expert'in yazdığı parçaları sınırlı bir kuyruğa aktarır (backpressure)."""
+
+    def __init__(self, q: queue.Queue, cancelled: threading.Event):
+        self.q = q
+        self.cancelled = cancelled
+
+    def put(self, item) -> bool:
+        """İptale duyarlı put: istemci gittiyse bloklamadan False döner."""
+        while not self.cancelled.is_set():
+            try:
+                self.q.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def write(self, data):
+        if not self.put(data):
+            # İstemci bağlantıyı kapattı -> COPY'yi yarıda kes
+            raise IOError("export iptal edildi")
+        return len(data)
+
+
+def _export_failed(fmt: str, error: Exception):
+    EXPORT_FAILURES.inc((fmt,))
+    logger.error("[EXPORT] %s dışa aktarma yarıda kesildi: %s", fmt, error)
+
+
+def _copy_csv_stream(sql: str, params: dict):
+    q = queue.Queue(maxsize=64)
+    cancelled = threading.Event()
+    done = object()
+
+    writer = _QueueWriter(q, cancelled)
+
+    def run_copy():
+        conn = read_engine.raw_connection()
+        try:
+            cur = conn.cursor()
+            select_sql = cur.mogrify(sql, params).decode()
+            cur.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", writer)
+            conn.rollback()
+        except Exception as e:
+            conn.rollback()
+            if not cancelled.is_set():
+                # Hata kuyruk üzerinden generator'a taşınır, orada yükseltilir
+                _export_failed("csv", e)
+                writer.put(e)
+        finally:
+            # Bağlantı kuyruğu beklemeden havuza döner; put iptal edilirse thread de biter
+            conn.close()
+            writer.put(done)
+
+    threading.Thread(target=run_copy, name="csv-export", daemon=True).start()
+    try:
+        while True:
+            chunk = q.get()
+            if chunk is done:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk if isinstance(chunk, bytes) else chunk.encode()
+    finally:
+        cancelled.set()
+
+
+def _ndjson_stream(sql: str, params: dict):
+    try:
+        with read_engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE).exec_driver_sql(sql, params)
+            columns = list(result.keys())
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n" for row in rows
+                ).encode()
+    except Exception as e:
+        _export_failed("ndjson", e)
+        raise
+
+
+def export_response(sql: str, params: dict, fmt: str, filename: str) -> StreamingResponse:
+    if fmt == "csv":
+        body, media_type = _copy_csv_stream(sql, params), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _ndjson_stream(sql, params), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,120 @@
+# heatmap.py
+# Mekan x haftanın günü x saat doluluk oranı (kapasite planlama).
+# Ham reservations yerine spot_hourly_occupancy özetinden tek sorguyla okunur.
+# Rezervasyon yazmaları özete değil spot_occupancy_deltas'a eklenir; sweeper bunları periyodik olarak
+# özete katlar. Okuma henüz katlanmamış değişiklikleri de ekler -> heatmap katlama aralığından bağımsız güncel.
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from database import SessionLocal
+
+# Varsayılan aralık: son 8 hafta
+DEFAULT_HEATMAP_DAYS = 56
+MAX_HEATMAP_DAYS = 366
+# Biriken doluluk değişiklikleri kaç saniyede bir özete katlansın
+SPOT_OCCUPANCY_FOLD_INTERVAL = float(os.getenv("SPOT_OCCUPANCY_FOLD_INTERVAL", "60"))
+
+# Gün (ISO: 1 = Pazartesi) ve saat bazında toplanmış koltuk-dakika
+HEATMAP_QUERY = text("""
+    SELECT o.spot_id, EXTRACT(ISODOW FROM o.bucket)::INT AS weekday, EXTRACT(HOUR FROM o.bucket)::INT AS hour,
+           SUM(o.seat_minutes) AS seat_minutes
+    FROM (
+        SELECT spot_id, bucket, seat_minutes FROM spot_hourly_occupancy
+        WHERE bucket >= :date_from AND bucket < :date_to
+        UNION ALL
+        SELECT d.spot_id, b.bucket, d.sign * b.minutes
+        FROM spot_occupancy_deltas d
+        CROSS JOIN LATERAL occupancy_buckets(d.start_time, d.end_time) b
+        WHERE d.start_time < :date_to AND d.end_time > :date_from
+          AND b.bucket >= :date_from AND b.bucket < :date_to
+    ) o
+    WHERE CAST(:spot_ids AS INT[]) IS NULL OR o.spot_id = ANY(CAST(:spot_ids AS INT[]))
+    GROUP BY 1, 2, 3
+""")
+
+SPOTS_QUERY = text("""
+    SELECT spot_id, name, capacity FROM study_spots
+    WHERE CAST(:spot_ids AS INT[]) IS NULL OR spot_id = ANY(CAST(:spot_ids AS INT[]))
+    ORDER BY spot_id
+""")
+
+_last_fold = 0.0
+
+
+def fold_spot_occupancy() -> int:
+    """Bekleyen doluluk değişikliklerini özete katlar. Katlanan değişiklik sayısını döndürür."""
+    db = SessionLocal()
+    try:
+        folded = db.execute(text("SELECT fold_spot_occupancy()")).scalar()
+        db.commit()
+        return folded
+    except Exception as e:
+        db.rollback()
+        print(f"Doluluk özeti katlanamadı: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+def maybe_fold_spot_occupancy():
+    # Sweeper döngüsünden çağrılır; aralık dolmadıysa bir şey yapmaz
+    global _last_fold
+    if time.monotonic() - _last_fold >= SPOT_OCCUPANCY_FOLD_INTERVAL:
+        fold_spot_occupancy()
+        _last_fold = time.monotonic()
+
+
+def heatmap_range(date_from: date = None, date_to: date = None):
+    """[başlangıç, bitiş) datetime aralığı. date_to dahil."""
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_HEATMAP_DAYS - 1)
+    if date_from > date_to:
+        raise ValueError("date_from, date_to'dan sonra olamaz.")
+    if (date_to - date_from).days + 1 > MAX_HEATMAP_DAYS:
+        raise ValueError(f"Aralık en fazla {MAX_HEATMAP_DAYS} gün olabilir.")
+    start = datetime.combine(date_from, datetime.min.time())
+    return start, datetime.combine(date_to, datetime.min.time()) + timedelta(days=1)
+
+
+def weekday_counts(start: datetime, end: datetime) -> np.ndarray:
+    """Aralıkta her haftanın gününden (Pzt..Paz) kaç tane var -> paydadaki saat sayısı için."""
+    days = (end - start).days
+    counts = np.full(7, days // 7, dtype=np.int64)
+    for i in range(days % 7):
+        counts[(start.weekday() + i) % 7] += 1
+    return counts
+
+
+def build_heatmap(spots, rows, start: datetime, end: datetime) -> list:
+    """
+    Her mekan için 7 x 24 doluluk oranı matrisi (satır: Pazartesi..Pazar, sütun: saat).
+    oran = dolu koltuk-dakika / (kapasite * 60 * o gün-saatin aralıktaki tekrar sayısı)
+    """
+    index = {s.spot_id: i for i, s in enumerate(spots)}
+    minutes = np.zeros((len(spots), 7, 24), dtype=np.float64)
+    for r in rows:
+        i = index.get(r.spot_id)
+        if i is not None:  # silinmiş mekanların özet satırları atlanır
+            minutes[i, r.weekday - 1, r.hour] = r.seat_minutes
+
+    capacity = np.array([s.capacity or 0 for s in spots], dtype=np.float64)
+    denominator = capacity[:, None, None] * 60 * weekday_counts(start, end)[None, :, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        utilization = np.where(denominator > 0, minutes / denominator, 0.0)
+    utilization = np.round(np.clip(utilization, 0, 1), 4)
+
+    result = []
+    for i, s in enumerate(spots):
+        weekday, hour = np.unravel_index(np.argmax(utilization[i]), (7, 24))
+        result.append({
+            "spot_id": s.spot_id,
+            "name": s.name,
+            "capacity": s.capacity,
+            "utilization": utilization[i].tolist(),
+            "peak": {"weekday": int(weekday) + 1, "hour": int(hour), "utilization": float(utilization[i, weekday, hour])},
+        })
+    return result
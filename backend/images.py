@@ -0,0 +1,107 @@
+# images.py
+# Mekan görselleri için içerik adresli (content-addressed) disk deposu.
+# AddSpotModal görseli base64 data URL olarak gönderiyor; bunu bir kez çözüp SHA-256 özetiyle
+# diske yazıyoruz, küçük boyutları yüklemede üretiyoruz. DB'de (image_url) sadece "img:<özet>" tutuluyor.
+# Dosyalar /media altından uzun süreli (immutable) cache başlığıyla servis edilir.
+import base64
+import binascii
+import hashlib
+import io
+import os
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from PIL import Image, UnidentifiedImageError
+
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", Path(__file__).parent / "media"))
+# Frontend farklı porttan (5173) çalıştığı için API mutlak URL döndürür
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", "http://localhost:8000").rstrip("/")
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(5 * 1024 * 1024)))
+
+IMAGE_REF_PREFIX = "img:"
+PLACEHOLDER_URL = "https://via.placeholder.com/300"
+
+# Yüklemede üretilen boyutlar (genişlik, px)
+IMAGE_SIZES = {
+    "thumb": 320,   # MyReservations listesi
+    "card": 600,    # SpotCard / SpotDetail
+    "full": 1600,
+}
+ALLOWED_MIME_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif")
+
+MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
+
+
+class ImageError(ValueError):
+    pass
+
+
+class ImmutableStaticFiles(StaticFiles):
+    # Dosya adı içerik özetinden geldiği için içerik asla değişmez -> tarayıcı 1 yıl cache'leyebilir
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+def _variant_path(digest: str, size: str) -> Path:
+    return MEDIA_ROOT / digest[:2] / digest / f"{size}.jpg"
+
+
+def store_data_url(data_url: str) -> str:
+    """
+    "data:image/png;base64,...." -> "img:<sha256>"
+    Aynı görsel ikinci kez yüklenirse tekrar işlenmez (özet aynı).
+    """
+    header, sep, payload = data_url.partition(",")
+    if not sep or not header.startswith("data:") or ";base64" not in header:
+        raise ImageError("Görsel base64 data URL formatında olmalı.")
+    mime = header[5:].split(";")[0].lower()
+    if mime not in ALLOWED_MIME_TYPES:
+        raise ImageError(f"Desteklenmeyen görsel türü: {mime or 'bilinmiyor'}")
+    if len(payload) * 3 // 4 > MAX_IMAGE_BYTES:
+        raise ImageError(f"Görsel en fazla {MAX_IMAGE_BYTES // (1024 * 1024)} MB olabilir.")
+    try:
+        raw = base64.b64decode(payload, validate=True)
+    except binascii.Error:
+        raise ImageError("Görsel verisi çözülemedi.")
+
+    digest = hashlib.sha256(raw).hexdigest()
+    if _variant_path(digest, "full").exists():
+        return IMAGE_REF_PREFIX + digest
+
+    try:
+        image = Image.open(io.BytesIO(raw))
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        raise ImageError("Geçerli bir görsel değil.")
+    if image.mode != "RGB":
+        # Şeffaf PNG/GIF -> beyaz zemin üzerine
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+
+    target_dir = MEDIA_ROOT / digest[:2] / digest
+    target_dir.mkdir(parents=True, exist_ok=True)
+    # "full" en son yazılır: varlığı tüm boyutların hazır olduğunu gösterir
+    for size, width in sorted(IMAGE_SIZES.items(), key=lambda item: item[0] == "full"):
+        variant = image.copy()
+        variant.thumbnail((width, width * 4))
+        tmp_path = target_dir / f".{size}.tmp"
+        variant.save(tmp_path, "JPEG", quality=80, optimize=True, progressive=True)
+        os.replace(tmp_path, _variant_path(digest, size))
+    return IMAGE_REF_PREFIX + digest
+
+
+def resolve_image(image_url: str, size: str = "card", placeholder: str = PLACEHOLDER_URL) -> str:
+    """DB'deki değeri istemcinin kullanacağı URL'e çevirir."""
+    if not image_url:
+        return placeholder
+    if image_url.startswith(IMAGE_REF_PREFIX):
+        digest = image_url[len(IMAGE_REF_PREFIX):]
+        return f"{MEDIA_BASE_URL}/media/{digest[:2]}/{digest}/{size}.jpg"
+    # Harici Unsplash görselleri için boyut parametresi (eski kayıtlar)
+    if "images.unsplash.com" in image_url and "?" not in image_url:
+        return f"{image_url}?w={IMAGE_SIZES.get(size, 600)}&q=80&auto=format&fit=crop"
+    return image_url
@@ -0,0 +1,184 @@
+# live.py
+# Canlı koltuk doluluğu (Server-Sent Events): SpotDetail sayfası /occupied'ı tekrar tekrar sorgulamak yerine
+# /api/spots/{id}/occupancy/stream'e bağlanır, önce anlık durumu sonra sadece değişiklikleri alır.
+# Kaynak Postgres LISTEN 'seat_events' (bkz. setup.sql: trg_seat_events, trg_spot_availability_events).
+# Her worker tek bir dinleyici bağlantısı açar; gelen olay önce bu worker'ın koltuk indeksine işlenir
+# (diğer worker'ların yazmaları da sweeper'ı beklemeden indekse düşer), sonra o mekanın abonelerine dağıtılır.
+import asyncio
+import json
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from database import async_engine
+from seat_index import seat_index, parse_ts, refresh_seat_index
+
+SEAT_EVENTS_CHANNEL = "seat_events"
+# Abone başına olay kuyruğu; yavaş istemcinin kuyruğu dolarsa olaylar atılır, istemciye tam durum yeniden gönderilir
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+# Boşta kalan bağlantıya bu aralıkla yorum satırı gönderilir (proxy zaman aşımı / kopan istemci tespiti)
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Dinleyici bağlantısı koparsa kaç saniye sonra tekrar bağlanılsın
+LIVE_RECONNECT_SECONDS = float(os.getenv("LIVE_RECONNECT_SECONDS", "5"))
+
+RESYNC = {"op": "resync"}
+
+
+class Subscription:
+    __slots__ = ("spot_id", "queue", "lagged")
+
+    def __init__(self, spot_id: int):
+        self.spot_id = spot_id
+        self.queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        self.lagged = False
+
+
+class SeatEventHub:
+    def __init__(self):
+        self._subs = {}      # spot_id -> set(Subscription)
+        self._task = None
+        self.connected = False
+
+    # --- Aboneler (hepsi event loop üzerinde çalışır, kilit gerekmez) ---
+    def subscribe(self, spot_id: int) -> Subscription:
+        sub = Subscription(spot_id)
+        self._subs.setdefault(spot_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._subs.get(sub.spot_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.spot_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subs.values())
+
+    def _deliver(self, sub: Subscription, event: dict):
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            sub.lagged = True
+
+    def publish(self, event: dict):
+        for sub in list(self._subs.get(event.get("spot"), ())):
+            self._deliver(sub, event)
+
+    def resync_all(self):
+        # Dinleyici koptuğunda aradaki olaylar kaçmış olabilir -> herkes tam durumu yeniden alsın
+        for subs in list(self._subs.values()):
+            for sub in list(subs):
+                self._deliver(sub, RESYNC)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if event.get("op") == "add":
+            seat_index.add(event["id"], event["spot"], event["seat"], event["start"], event["end"])
+        elif event.get("op") == "remove":
+            seat_index.remove(event["id"])
+        self.publish(event)
+
+    # --- Dinleyici ---
+    async def _listen(self):
+        while True:
+            try:
+                async with async_engine.connect() as conn:
+                    raw = (await conn.get_raw_connection()).driver_connection
+                    lost = asyncio.Event()
+                    raw.add_termination_listener(lambda _: lost.set())
+                    try:
+                        await raw.add_listener(SEAT_EVENTS_CHANNEL, self._on_notify)
+                        self.connected = True
+                        # Bağlantı yokken kaçan yazmalar için indeks bir kez baştan kurulur; bundan sonra
+                        # olaylar sürekli geldiği için indeks yaşından bağımsız taze sayılır.
+                        # (Yükleme sırasında gelen olaylar load() içinde tekrar uygulanır.)
+                        await run_in_threadpool(refresh_seat_index)
+                        seat_index.set_live(seat_index.ready)
+                        await lost.wait()
+                    finally:
+                        seat_index.set_live(False)
+                        self.connected = False
+                        # LISTEN durumu havuza geri dönmesin: bağlantı kapatılır
+                        await conn.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"seat_events dinleyicisi hatası: {e}")
+            self.resync_all()
+            await asyncio.sleep(LIVE_RECONNECT_SECONDS)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def gauges(self):
+        return [
+            ("studyflow_live_subscribers", "Açık canlı doluluk (SSE) bağlantısı", {(): self.subscriber_count()}),
+            ("studyflow_live_listener_connected", "seat_events LISTEN bağlantısı açık mı", {(): int(self.connected)}),
+        ]
+
+
+seat_events = SeatEventHub()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _touches(event: dict, start, end) -> bool:
+    ev_start, ev_end = parse_ts(event["start"]), parse_ts(event["end"])
+    return ev_start is not None and ev_end is not None and ev_start < end and ev_end > start
+
+
+async def occupancy_events(request, spot_id: int, start, end, load_occupied):
+    """
+    SSE akışı: önce 'snapshot' (dolu koltuklar), sonra pencereyi etkileyen her değişiklikte 'delta'
+    ({"occupied": [yeni dolanlar], "released": [boşalanlar]}), mekan bakıma alınınca 'spot'.
+    load_occupied() -> dolu koltuk listesi. Pencerenin doluluğu olay başına yeniden hesaplanır
+    (koltuk indeksinde mikro saniyeler); aynı koltuğun pencerede birden fazla kaydı olabileceği için
+    tek olaydan çıkarım yapılmaz.
+    """
+    sub = seat_events.subscribe(spot_id)
+    try:
+        occupied = set(await load_occupied())
+        yield _sse("snapshot", {"spotId": spot_id, "occupied": sorted(occupied), "live": seat_events.connected})
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+
+            if event["op"] == "spot":
+                yield _sse("spot", {"spotId": spot_id, "available": event["available"]})
+                continue
+            if sub.lagged or event["op"] == "resync":
+                # Kuyruktaki eski olaylar artık gereksiz, tam durum yeniden hesaplanır
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.lagged = False
+            elif not _touches(event, start, end):
+                continue
+
+            fresh = set(await load_occupied())
+            added, released = fresh - occupied, occupied - fresh
+            occupied = fresh
+            if added or released:
+                yield _sse("delta", {"occupied": sorted(added), "released": sorted(released)})
+    finally:
+        seat_events.unsubscribe(sub)
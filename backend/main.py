@@ -1,12 +1,66 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+import anyio
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from database import get_db
-from schemas import ReservationCreate, SpotCreate, ReviewCreate, UserUpdate, UserLogin, UserRegister
+from database import (get_db, get_async_db, get_read_db, get_async_read_db, pg_error_code, pg_constraint_name,
+                      engine, async_engine, replica_engine, async_replica_engine, AsyncReadSessionLocal,
+                      ReadAfterWriteMiddleware, READ_AFTER_HEADER, THREADPOOL_SIZE, WRITE_XID_COLUMN, note_write,
+                      replica_position)
+from cache import spots_cache, invalidate_spots
+from search import normalize_query, like_escape
+from sweeper import start_status_sweeper, stop_status_sweeper, effective_status_sql
+from partitions import ensure_partitions
+from heatmap import HEATMAP_QUERY, SPOTS_QUERY as HEATMAP_SPOTS_QUERY, heatmap_range, build_heatmap
+from cohorts import cohort_index, build_expression, bitmap_to_ids, ExpressionError
+from seat_index import seat_index, refresh_seat_index, parse_ts
+from live import seat_events, occupancy_events
+from pagination import decode_cursor, keyset_page, stream_json_array
+from booking import (MAX_BATCH_SIZE, MAX_RESERVATION_HOURS, BATCH_INSERT_QUERY, BATCH_SEAT_LOCK_QUERY,
+                     BATCH_LOCK_TIMEOUT_MS, RETRYABLE_SQLSTATES, BOOKING_OUTCOMES, seat_locks, insert_reservation,
+                     conflict_response, expand_batch, find_batch_overlaps)
+from availability import DAY_RESERVATIONS_QUERY, parse_slot, occupancy_grid, encode_grid, day_bounds
+from admin_stats import get_admin_stats, get_admin_stats_history
+from images import MEDIA_ROOT, ImmutableStaticFiles, ImageError, store_data_url, resolve_image
+from versions import (SPOTS_RESOURCE, USERS_RESOURCE, spot_reviews_resource, user_history_resource,
+                      fetch_version, conditional_response, is_not_modified)
+from export import EXPORT_FORMATS, RESERVATIONS_EXPORT_SQL, REVIEWS_EXPORT_SQL, build_export_query, export_response
+from metrics import MetricsMiddleware, instrument_engine, pool_gauges, register_gauges, render_metrics
+from schemas import ReservationCreate, ReservationBatchCreate, SpotCreate, ReviewCreate, UserUpdate, UserLogin, UserRegister
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Senkron (def) endpoint'ler Starlette threadpool'unda çalışır, varsayılan limit 40
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # reservations aylık partition'lı: önümüzdeki ayların partition'ları hazır olsun
+    await run_in_threadpool(ensure_partitions)
+    # Koltuk doluluk indeksini belleğe yükle (/occupied ve çakışma kontrolleri buradan cevaplanır)
+    await run_in_threadpool(refresh_seat_index)
+    # Süresi dolan rezervasyonlar istek yolunda değil, arka planda güncellenir
+    start_status_sweeper()
+    # Diğer worker'ların yazmaları / canlı doluluk akışı için Postgres LISTEN
+    seat_events.start()
+    # Read-your-writes: replikanın gördüğü transaction'lar arka planda izlenir (replika tanımlıysa)
+    replica_position.start()
+    yield
+    await replica_position.stop()
+    await seat_events.stop()
+    stop_status_sweeper()
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+# Yüklenen mekan görselleri (içerik adresli, immutable cache başlıklı)
+app.mount("/media", ImmutableStaticFiles(directory=MEDIA_ROOT), name="media")
+
+# Admin listelerinde tek sayfada dönebilecek en fazla kayıt
+MAX_PAGE_SIZE = 1000
 
 # CORS Ayarları (Frontend 5173 portunda, Backend 8000'de olduğu için izin veriyoruz)
 app.add_middleware(
@@ -15,14 +69,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_AFTER_HEADER],
 )
 
-# Süresi dolmuş rezervasyonları otomatik güncelleyen fonksiyon
-def check_and_update_statuses(db: Session):
-    # Bitiş saati geçmiş olan AKTİF rezervasyonları TAMAMLANDI yap
-    query = text("UPDATE reservations SET status = 'TAMAMLANDI' WHERE end_time < NOW() AND status = 'AKTİF'")
-    db.execute(query)
-    db.commit()
+# Yazma yanıtlarına yazan transaction'ın id'si (read-your-writes, sadece REPLICA_DATABASE_URL tanımlıysa)
+app.add_middleware(ReadAfterWriteMiddleware)
+
+# Gecikme / sorgu metrikleri (en dışta: CORS dahil tüm istek süresi ölçülür)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+pools = {"sync": engine, "async": async_engine.sync_engine}
+if replica_engine is not engine:
+    instrument_engine(replica_engine, "replica")
+    instrument_engine(async_replica_engine.sync_engine, "async_replica")
+    pools.update({"replica": replica_engine, "async_replica": async_replica_engine.sync_engine})
+register_gauges(pool_gauges(pools))
+register_gauges(seat_events.gauges)
+register_gauges(replica_position.gauges)
+
+# --- 0. METRİKLER (Prometheus text formatı) ---
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # --- 1. LOGIN İŞLEMİ (DB'den Kontrol) ---
 @app.post("/api/login")
@@ -45,121 +114,263 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     }
 
 # --- 2. MEKANLARI GETİR (PERFORMANS OPTİMİZASYONLU) ---
-@app.get("/api/spots")
-def get_spots(q: str = None, db: Session = Depends(get_db)):
-    # SQL Sorgusu: Hem mekan bilgilerini al, hem de reviews tablosundan ortalamayı hesapla (COALESCE ile null ise 0 yap)
-    # ROUND(AVG(...), 1) -> Puanı virgülden sonra 1 basamak yuvarla (Örn: 4.3)
+async def load_spots(db: AsyncSession, q: str = None):
+    # SQL Sorgusu: Puan ortalaması artık reviews tablosu taranarak değil, study_spots üzerindeki
+    # trigger ile güncel tutulan özet sütunlardan (rating_sum / rating_count) hesaplanıyor -> JOIN/GROUP BY yok
+    # ROUND(..., 1) -> Puanı virgülden sonra 1 basamak yuvarla (Örn: 4.3)
     base_query = """
         SELECT 
             s.spot_id, s.name, s.capacity, s.features, s.is_available, s.image_url,
-            COALESCE(ROUND(AVG(r.rating), 1), 0) as avg_rating,
-            COUNT(r.review_id) as review_count
+            COALESCE(ROUND(s.rating_sum::NUMERIC / NULLIF(s.rating_count, 0), 1), 0) as avg_rating,
+            s.rating_count as review_count,
+            s.rating_hist
         FROM study_spots s
-        LEFT JOIN reviews r ON s.spot_id = r.spot_id
     """
     
     if q:
-        base_query += " WHERE s.name ILIKE :search"
-        base_query += " GROUP BY s.spot_id ORDER BY s.spot_id"
-        result = db.execute(text(base_query), {"search": f"%{q}%"}).fetchall()
+        # q burada normalize_query'den geçmiş (Türkçe katlanmış) halde gelir.
+        # LIKE '%q%' ve word_similarity (<%) ikisi de trigram GIN indeksini kullanır.
+        # Sıralama: ismi/özelliği aramayla başlayanlar, sonra benzerlik skoru.
+        base_query += " WHERE s.search_text LIKE :pattern OR :term <% s.search_text"
+        base_query += """
+            ORDER BY (s.search_text LIKE :prefix) DESC, word_similarity(:term, s.search_text) DESC, s.spot_id"""
+        term = like_escape(q)
+        result = (await db.execute(text(base_query), {
+            "term": q, "pattern": f"%{term}%", "prefix": f"{term}%"
+        })).fetchall()
     else:
-        base_query += " GROUP BY s.spot_id ORDER BY s.spot_id"
-        result = db.execute(text(base_query)).fetchall()
+        base_query += " ORDER BY s.spot_id"
+        result = (await db.execute(text(base_query))).fetchall()
     
     spots_list = []
     for row in result:
-        # Görsel Optimizasyonu (Performans İçin)
-        raw_img = row.image_url or "https://via.placeholder.com/300"
-        optimized_img = raw_img
-        if "images.unsplash.com" in raw_img and "?" not in raw_img:
-            optimized_img = f"{raw_img}?w=600&q=80&auto=format&fit=crop"
-
         spots_list.append({
             "id": row.spot_id,
             "name": row.name,
             "capacity": row.capacity,
             "features": row.features.split(", ") if row.features else [],
             "isAvailable": row.is_available,
-            "image_url": optimized_img,
+            # Görsel Optimizasyonu: yüklenen görseller /media altında hazır boyutlarda (img:<özet>)
+            "image_url": resolve_image(row.image_url, "card"),
+            "thumbnail_url": resolve_image(row.image_url, "thumb"),
             "average_rating": float(row.avg_rating), # Decimal'i float yap
-            "total_reviews": row.review_count
+            "total_reviews": row.review_count,
+            "rating_histogram": row.rating_hist  # [1 yıldız, ..., 5 yıldız] adetleri
         })
     return spots_list
 
+@app.get("/api/spots")
+async def get_spots(request: Request, q: str = None, db: AsyncSession = Depends(get_async_read_db)):
+    # Read-through cache: Aynı katalog/arama isteği DB'de liste sorgusunu tekrar çalıştırmaz.
+    # Anahtar katlanmış arama: "Kütü", "kutu" ve "KÜTÜ" aynı cache kaydını kullanır.
+    # Cache worker'a özel: invalidate_spots() sadece yazmayı yapan worker'ı temizler. Bu yüzden her istekte
+    # önce 'spots' sürümü (tek satırlık PK okuması) okunur; cache'teki kayıt başka bir sürüme aitse
+    # (başka worker'da yazma olduysa) kullanılmaz, liste yeniden yüklenir. İstemci bu sürümü zaten
+    # biliyorsa liste hiç okunmadan 304 döner.
+    term = normalize_query(q)
+    etag, last_modified = await fetch_version(db, [SPOTS_RESOURCE])
+    cache_control = "public, max-age=0, must-revalidate"
+    if is_not_modified(request, etag, last_modified):
+        return conditional_response(request, etag, last_modified, None, cache_control)
+
+    # Kendi yazmasını okuyan istek (primary'ye yönlendirildi) cache'i atlar: replikadan yüklenmiş
+    # eski listeyi görmesin, kendi taze sonucunu da diğerlerinin cache'ine yazmasın.
+    if db.info.get("primary"):
+        return conditional_response(request, etag, last_modified, await load_spots(db, term), cache_control)
+
+    cached = spots_cache.get(term)
+    if cached is not None and cached[0] == etag:
+        spots = cached[1]
+    else:
+        generation = spots_cache.generation
+        spots = await load_spots(db, term)
+        spots_cache.set(term, (etag, spots), generation)
+    return conditional_response(request, etag, last_modified, spots, cache_control)
+
 # --- 3. REZERVASYON YAP ---
 @app.post("/api/reservations/create")
-def create_reservation(res: ReservationCreate, db: Session = Depends(get_db)):
+async def create_reservation(res: ReservationCreate, db: AsyncSession = Depends(get_async_db)):
+    # asyncpg TIMESTAMP parametresi için string değil datetime ister
+    start_ts, end_ts = parse_ts(res.start), parse_ts(res.end)
+    if start_ts is None or end_ts is None:
+        raise HTTPException(status_code=400, detail="Geçersiz tarih formatı.")
+    # period (tsrange) sütunu CHECK'ten önce hesaplandığı için ters aralık DB'de 400'e çevrilemeyen hata verir
+    if end_ts <= start_ts:
+        raise HTTPException(status_code=400, detail="Bitiş saati başlangıç saatinden sonra olmalı.")
+    def seat_taken():
+        BOOKING_OUTCOMES.inc(("single", "taken"))
+        return conflict_response(
+            "SEAT_TAKEN", f"{res.seatNumber} numaralı koltuk bu saatlerde dolu! Lütfen başka koltuk seçin.",
+            headers={"X-Constraint-Name": "no_seat_overlap"}, spotId=res.spotId, seatNumber=res.seatNumber
+        )
+
+    # 1. ÇAKIŞMA KONTROLÜ (Sadece Seçilen Koltuk İçin)
+    # Mantık: Aynı mekanda, AYNI KOLTUKTA, tarih aralığı çakışan ve İPTAL edilmemiş rezervasyon var mı?
+    # Bellekteki koltuk indeksi bariz çakışmaları DB'ye gitmeden reddeder.
+    # Asıl garanti DB'de: no_seat_overlap EXCLUSION CONSTRAINT çakışan INSERT'i reddeder,
+    # bu yüzden ayrıca SELECT atmıyoruz (tek round trip, yarış durumu yok).
+    if seat_index.covers(start_ts) and seat_index.is_occupied(res.spotId, res.seatNumber, start_ts, end_ts):
+        return seat_taken()
+
+    # 2. REZERVASYONU KAYDET
+    # Sadece aynı koltuğa gelen istekler sıraya girer: worker içinde asyncio kilidi, worker'lar arasında
+    # (spot_id, seat_number) advisory lock. Sıra bekleyen istek, önceki kaydedildiyse indeksten hemen 409 alır.
+    async with seat_locks.hold((res.spotId, res.seatNumber)):
+        if seat_index.covers(start_ts) and seat_index.is_occupied(res.spotId, res.seatNumber, start_ts, end_ts):
+            return seat_taken()
+        try:
+            reservation_id = await insert_reservation(db, {
+                "uid": res.userId,
+                "sid": res.spotId,
+                "start": start_ts,
+                "end": end_ts,
+                "seat": res.seatNumber
+            })
+            if reservation_id is None:
+                BOOKING_OUTCOMES.inc(("single", "busy"))
+                return conflict_response(
+                    "SEAT_BUSY", f"{res.seatNumber} numaralı koltuk için şu an başka bir işlem sürüyor, lütfen tekrar deneyin.",
+                    retryable=True, spotId=res.spotId, seatNumber=res.seatNumber
+                )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            # EXCLUSION CONSTRAINT İHLALİ (no_seat_overlap) -> 23P01
+            if pg_error_code(e) == "23P01":
+                return seat_taken()
+            # chk_reservation_time: bitiş başlangıçtan önce / chk_reservation_length: 24 saatten uzun
+            if pg_error_code(e) == "23514":
+                if pg_constraint_name(e) == "chk_reservation_length":
+                    raise HTTPException(status_code=400, detail=f"Bir rezervasyon en fazla {MAX_RESERVATION_HOURS} saat olabilir.")
+                raise HTTPException(status_code=400, detail="Bitiş saati başlangıç saatinden sonra olmalı.")
+            raise HTTPException(status_code=500, detail=str(e))
+        seat_index.add(reservation_id, res.spotId, res.seatNumber, start_ts, end_ts)
+
+    cohort_index.add(res.spotId, res.userId)
+    BOOKING_OUTCOMES.inc(("single", "created"))
+    return {"message": "Rezervasyon başarılı!"}
+
+# --- 3B. TOPLU / TEKRARLAYAN REZERVASYON ---
+@app.post("/api/reservations/batch")
+async def create_reservation_batch(batch: ReservationBatchCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Liste halinde veya tekrar kuralıyla (örn. her Pzt/Çar 14:00-16:00, 10 hafta) çok sayıda rezervasyonu
+    tek transaction'da oluşturur. Çakışma kontrolü ve INSERT tek set-based ifadede yapılır.
+    Her aday için sonuç döner: created / conflict / invalid
+    """
     try:
-        # 1. ÇAKIŞMA KONTROLÜ (Sadece Seçilen Koltuk İçin)
-        # Mantık: Aynı mekanda, AYNI KOLTUKTA, tarih aralığı çakışan ve İPTAL edilmemiş rezervasyon var mı?
-        conflict_query = text("""
-            SELECT * FROM reservations 
-            WHERE spot_id = :sid 
-            AND seat_number = :seat
-            AND status != 'İPTAL'
-            AND (
-                (start_time < :end AND end_time > :start)
-            )
-        """)
-        
-        conflict = db.execute(conflict_query, {
-            "sid": res.spotId, 
-            "seat": res.seatNumber, 
-            "start": res.start, 
-            "end": res.end
-        }).fetchone()
+        candidates, invalid = expand_batch(batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        if conflict:
-            raise HTTPException(status_code=409, detail=f"{res.seatNumber} numaralı koltuk bu saatlerde dolu!")
+    total = len(candidates) + len(invalid)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="En az bir rezervasyon veya tekrar kuralı gerekli.")
+    if total > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Tek istekte en fazla {MAX_BATCH_SIZE} rezervasyon oluşturulabilir.")
 
-        # 2. REZERVASYONU KAYDET
-        insert_query = text("""
-            INSERT INTO reservations (user_id, spot_id, start_time, end_time, seat_number, status) 
-            VALUES (:uid, :sid, :start, :end, :seat, 'AKTİF')
-        """)
-        db.execute(insert_query, {
-            "uid": res.userId, 
-            "sid": res.spotId, 
-            "start": res.start, 
-            "end": res.end,
-            "seat": res.seatNumber
-        })
-        
-        db.commit()
-        return {"message": "Rezervasyon başarılı!"}
+    overlapping = find_batch_overlaps(candidates)
+    results = list(invalid)
+    results += [
+        {"index": i, "status": "conflict", "detail": "Aynı istekteki başka bir rezervasyonla çakışıyor."}
+        for i in overlapping
+    ]
+    to_insert = [c for c in candidates if c["index"] not in overlapping]
 
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        db.rollback()
-        # TRIGGER HATASI KONTROL (trg_check_overlap)
-        if "Bu saat aralığında bu mekan dolu" in str(e) or "Trigger Hatası" in str(e):
-            raise HTTPException(
-                status_code=409, 
-                detail=f"⚠️ TRIGGER UYARISI: Bu koltuk bu saatlerde dolu! Lütfen başka koltuk seçin.",
-                headers={"X-Trigger-Name": "trg_check_overlap"}
-            )
-        raise HTTPException(status_code=500, detail=str(e))
+    def finish(created_count, status_code=200):
+        results.sort(key=lambda r: r["index"])
+        body = {
+            "message": f"{created_count}/{total} rezervasyon oluşturuldu.",
+            "created": created_count,
+            "failed": total - created_count,
+            "results": results
+        }
+        return body if status_code == 200 else JSONResponse(status_code=status_code, content=body)
+
+    if batch.allOrNothing and results:
+        return finish(0, 409)
+
+    created = {}
+    if to_insert:
+        try:
+            # Koltuk kilitleri (tekli rezervasyonlarla aynı anahtar); uzun süre alınamazsa 55P03
+            await db.execute(text(f"SET LOCAL lock_timeout = {BATCH_LOCK_TIMEOUT_MS}"))
+            await db.execute(BATCH_SEAT_LOCK_QUERY, {
+                "sids": [c["spotId"] for c in to_insert],
+                "seats": [c["seatNumber"] for c in to_insert]
+            })
+            rows = (await db.execute(BATCH_INSERT_QUERY, {
+                "uids": [c["userId"] for c in to_insert],
+                "sids": [c["spotId"] for c in to_insert],
+                "seats": [c["seatNumber"] for c in to_insert],
+                "starts": [c["start"] for c in to_insert],
+                "ends": [c["end"] for c in to_insert]
+            })).fetchall()
+        except Exception as e:
+            await db.rollback()
+            if pg_error_code(e) == "23503":
+                raise HTTPException(status_code=400, detail="Kullanıcı veya mekan bulunamadı.")
+            # Ay sınırına taşan bir aday komşu partition'daki kayıtla çakıştı (trg_cross_partition_overlap).
+            # Bu kontrol ON CONFLICT ile atlanamaz, tüm istek reddedilir.
+            if pg_error_code(e) == "23P01":
+                BOOKING_OUTCOMES.inc(("batch", "taken"))
+                return conflict_response(
+                    "SEAT_TAKEN",
+                    "Ay sınırındaki bir rezervasyon mevcut bir kayıtla çakışıyor. Lütfen aralıkları kontrol edin.",
+                    headers={"X-Constraint-Name": "no_seat_overlap"}
+                )
+            if pg_error_code(e) in RETRYABLE_SQLSTATES:
+                BOOKING_OUTCOMES.inc(("batch", "busy"))
+                return conflict_response(
+                    "SEAT_BUSY", "Seçilen koltuklar için şu an başka işlemler sürüyor, lütfen tekrar deneyin.",
+                    retryable=True
+                )
+            raise HTTPException(status_code=500, detail=str(e))
+        created = {(r.spot_id, r.seat_number, r.start_time, r.end_time): r.reservation_id for r in rows}
+        note_write(db, rows[0] if rows else None)
+
+    conflicted = [c for c in to_insert if (c["spotId"], c["seatNumber"], c["start"], c["end"]) not in created]
+    results += [
+        {"index": c["index"], "status": "conflict", "detail": f"{c['seatNumber']} numaralı koltuk bu saatlerde dolu!"}
+        for c in conflicted
+    ]
+    if batch.allOrNothing and conflicted:
+        await db.rollback()
+        BOOKING_OUTCOMES.inc(("batch", "taken"))
+        return finish(0, 409)
+
+    await db.commit()
+    BOOKING_OUTCOMES.inc(("batch", "created"), len(created))
+    for c in to_insert:
+        rid = created.get((c["spotId"], c["seatNumber"], c["start"], c["end"]))
+        if rid is not None:
+            seat_index.add(rid, c["spotId"], c["seatNumber"], c["start"], c["end"])
+            cohort_index.add(c["spotId"], c["userId"])
+            results.append({
+                "index": c["index"],
+                "status": "created",
+                "reservationId": rid,
+                "start": c["start"].isoformat(),
+                "end": c["end"].isoformat()
+            })
+    return finish(len(created))
 
 # --- 4. ADMIN DASHBOARD STATS ---
 @app.get("/api/admin/stats")
-def get_admin_stats(db: Session = Depends(get_db)):
-    # View boş dönerse hata vermesin diye try-except veya kontrol
+def get_admin_stats_endpoint(db: Session = Depends(get_read_db)):
+    # View her istekte tabloları taramasın diye sweeper'ın yazdığı son görüntü okunur (kısa TTL cache ile).
+    # computed_at / stale_seconds: verinin ne kadar eski olduğu
     try:
-        query = text("SELECT * FROM admin_dashboard_stats")
-        row = db.execute(query).fetchone()
-        if row:
-            return {
-                "active_reservations": row.active_reservations,
-                "available_spots": row.available_spots,
-                "average_site_rating": float(row.average_site_rating), # Decimal hatası olmasın diye float yap
-                "total_students": row.total_students
-            }
-        return {"active_reservations": 0, "available_spots": 0, "average_site_rating": 0, "total_students": 0}
+        return get_admin_stats(db)
     except Exception as e:
         print(e)
         return {"active_reservations": 0, "available_spots": 0, "average_site_rating": 0, "total_students": 0}
 
+# --- 4B. ADMIN DASHBOARD TREND GEÇMİŞİ (saatlik) ---
+@app.get("/api/admin/stats/history")
+def get_admin_stats_history_endpoint(hours: int = Query(24, ge=1, le=24 * 90), db: Session = Depends(get_read_db)):
+    return get_admin_stats_history(db, hours)
+
 # --- 5. ADMIN MEKAN EKLEME ---
 @app.post("/api/admin/add-spot")
 def add_spot(spot: SpotCreate, db: Session = Depends(get_db)):
@@ -169,6 +380,14 @@ def add_spot(spot: SpotCreate, db: Session = Depends(get_db)):
     final_image = spot.image_url 
     if not final_image or len(final_image) < 10: # Boş veya çok kısaysa
         final_image = "https://images.unsplash.com/photo-1497366216548-37526070297c"
+    elif final_image.startswith("data:"):
+        # Base64 görsel bir kez çözülüp diske yazılır, DB'ye sadece kısa referans gider
+        try:
+            final_image = store_data_url(final_image)
+        except ImageError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif len(final_image) > 255:
+        raise HTTPException(status_code=400, detail="Görsel URL'i en fazla 255 karakter olabilir.")
     
     query = text("""
         INSERT INTO study_spots (name, capacity, features, is_available, image_url)
@@ -181,6 +400,7 @@ def add_spot(spot: SpotCreate, db: Session = Depends(get_db)):
         "img": final_image
     })
     db.commit()
+    invalidate_spots()
     return {"message": "Mekan eklendi"}
 
 # --- 6. ADMIN MEKAN SİLME ---
@@ -189,11 +409,26 @@ def delete_spot(spot_id: int, db: Session = Depends(get_db)):
     delete_query = text("DELETE FROM study_spots WHERE spot_id = :id")
     db.execute(delete_query, {"id": spot_id})
     db.commit()
+    invalidate_spots()
+    seat_index.drop_spot(spot_id)
+    cohort_index.drop_spot(spot_id)
     return {"message": "Silindi"}
 
 # --- 6B. ADMIN MEKAN BAKIMA ALMA (TRIGGER: trg_auto_cancel_maintenance) ---
+# Tek ifade: self-join eski is_available değerini verir; trigger iptal ettiği satır sayısını
+# 'studyflow.maintenance_cancelled' ayarına yazar, RETURNING satırı trigger çalıştıktan sonra üretildiği için
+# aynı ifadede okunur. (Eskiden bu sayı mekanın TÜM İPTAL kayıtlarını sayan ayrı bir sorguyla bulunuyordu.)
+SPOT_MAINTENANCE_QUERY = text(f"""
+    UPDATE study_spots s SET is_available = :available
+    FROM study_spots old
+    WHERE s.spot_id = :id AND old.spot_id = s.spot_id
+    RETURNING s.name, old.is_available AS was_available,
+              COALESCE(NULLIF(current_setting('studyflow.maintenance_cancelled', true), ''), '0')::INT AS cancelled,
+              {WRITE_XID_COLUMN}
+""")
+
 @app.put("/api/admin/spot/{spot_id}/maintenance")
-def set_spot_maintenance(spot_id: int, is_maintenance: bool, db: Session = Depends(get_db)):
+async def set_spot_maintenance(spot_id: int, is_maintenance: bool, db: AsyncSession = Depends(get_async_db)):
     """
     Mekanı bakıma almak/çıkarmak (TRIGGER tetiklenir)
     
@@ -202,63 +437,72 @@ def set_spot_maintenance(spot_id: int, is_maintenance: bool, db: Session = Depen
     - Frontend'e bilgilendirme mesajı döndürülür
     """
     try:
-        # Mekanın şu anki durumunu al
-        check_query = text("SELECT name, is_available FROM study_spots WHERE spot_id = :id")
-        spot = db.execute(check_query, {"id": spot_id}).fetchone()
-        
+        # Mekan durumunu güncelle (TRIGGER otomatik çalışacak)
+        spot = (await db.execute(SPOT_MAINTENANCE_QUERY, {"available": is_maintenance is False, "id": spot_id})).fetchone()
         if not spot:
             raise HTTPException(status_code=404, detail="Mekan bulunamadı.")
-        
-        # Mekan durumunu güncelle (TRIGGER otomatik çalışacak)
-        update_query = text("UPDATE study_spots SET is_available = :available WHERE spot_id = :id")
-        db.execute(update_query, {"available": is_maintenance is False, "id": spot_id})
-        
-        # Eğer bakıma alındıysa (is_maintenance = True), iptal edilen rezervasyonları say
-        if is_maintenance and spot.is_available:
-            # Trigger çalıştı, bu mekanın kaç AKTİF rezervasyonu iptal edildi?
-            count_query = text("""
-                SELECT COUNT(*) FROM reservations 
-                WHERE spot_id = :id AND status = 'İPTAL'
-            """)
-            cancelled_count = db.execute(count_query, {"id": spot_id}).scalar()
-            
-            db.commit()
-            
-            return {
-                "message": f"✅ TRIGGER BAŞARILI: '{spot.name}' bakıma alındı!",
-                "trigger_name": "trg_auto_cancel_maintenance",
-                "action": "maintenance_activated",
-                "spot_name": spot.name,
-                "cancelled_reservations": cancelled_count,
-                "details": f"{cancelled_count} adet AKTİF rezervasyon otomatik olarak iptal edildi."
-            }
-        else:
-            db.commit()
-            return {
-                "message": f"✅ '{spot.name}' bakımdan çıkarıldı!",
-                "trigger_name": "trg_auto_cancel_maintenance",
-                "action": "maintenance_deactivated",
-                "spot_name": spot.name
-            }
-    
+        note_write(db, spot)
+        await db.commit()
     except HTTPException as he:
         raise he
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Hata: {str(e)}")
 
+    invalidate_spots()
+    if is_maintenance and spot.was_available:
+        # Trigger toplu iptal yaptı. Dinleyici açıksa iptaller NOTIFY ile zaten indekse düşüyor;
+        # değilse bu mekan indekste DB'den tazelenir.
+        if spot.cancelled and not seat_events.connected:
+            await db.run_sync(lambda session: seat_index.reload_spot(session, spot_id))
+        return {
+            "message": f"✅ TRIGGER BAŞARILI: '{spot.name}' bakıma alındı!",
+            "trigger_name": "trg_auto_cancel_maintenance",
+            "action": "maintenance_activated",
+            "spot_name": spot.name,
+            "cancelled_reservations": spot.cancelled,
+            "details": f"{spot.cancelled} adet AKTİF rezervasyon otomatik olarak iptal edildi."
+        }
+    return {
+        "message": f"✅ '{spot.name}' bakımdan çıkarıldı!",
+        "trigger_name": "trg_auto_cancel_maintenance",
+        "action": "maintenance_deactivated",
+        "spot_name": spot.name
+    }
+
+# Bitişi geçmiş ama sweeper'ın henüz TAMAMLANDI'ya çekmediği kayıtlar: okurken TAMAMLANDI gösterilir
+# (effective status) ama sürüm artmamıştır. Sayıları ETag'e katılır -> bitiş saati geçince ETag değişir.
+# (Arşivdeki aylarda AKTİF kayıt kalmaz, bkz. archive_reservation_partitions; start_time koşulu gelecek
+# ayların partition'larını budar.)
+HISTORY_UNSWEPT_QUERY = text("""
+    SELECT COUNT(*) FROM reservations
+    WHERE user_id = :uid AND status = 'AKTİF' AND end_time < NOW() AND start_time < NOW()
+""")
+
 @app.get("/api/my-history")
-def get_history(user_id: int, db: Session = Depends(get_db)):
-    check_and_update_statuses(db)
-    # has_reviewed sütununu da çekiyoruz
-    query = text("""
-        SELECT r.reservation_id, s.name, r.start_time, r.end_time, r.status, s.image_url, s.spot_id, r.has_reviewed
-        FROM reservations r
+async def get_history(request: Request, user_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    # Koşullu GET: kullanıcının rezervasyonları ve mekan bilgileri değişmediyse ana sorgu çalışmaz.
+    # Not: Süresi dolan kayıtlar sweeper durumu güncelleyince sürüm değiştirir; o zamana kadar
+    # ETag'deki bekleyen kayıt sayısı değişir.
+    etag, last_modified = await fetch_version(db, [user_history_resource(user_id), SPOTS_RESOURCE])
+    unswept = (await db.execute(HISTORY_UNSWEPT_QUERY, {"uid": user_id})).scalar()
+    if unswept:
+        etag = f'{etag[:-1]}-e{unswept}"'
+        # Sürüm zamanı bitiş saatlerinin geçişini yansıtmaz -> sadece ETag ile doğrulansın
+        last_modified = None
+    if is_not_modified(request, etag, last_modified):
+        return conditional_response(request, etag, last_modified, None, "private, no-cache")
+    # has_reviewed sütununu da çekiyoruz (reservations_all: arşive taşınmış eski aylar dahil)
+    # Durum okurken hesaplanır (effective status), bu endpoint artık hiç yazma yapmaz
+    query = text(f"""
+        SELECT r.reservation_id, s.name, r.start_time, r.end_time, {effective_status_sql("r")} as status,
+               s.image_url, s.spot_id, r.has_reviewed
+        FROM reservations_all r
         JOIN study_spots s ON r.spot_id = s.spot_id
         WHERE r.user_id = :uid
         ORDER BY r.start_time DESC
     """)
-    result = db.execute(query, {"uid": user_id}).fetchall()
+    result = (await db.execute(query, {"uid": user_id})).fetchall()
     
     history = []
     for row in result:
@@ -272,47 +516,57 @@ def get_history(user_id: int, db: Session = Depends(get_db)):
             "date": date_str,
             "time": time_str,
             "status": row.status,
-            "image": row.image_url or "https://via.placeholder.com/150",
+            "image": resolve_image(row.image_url, "thumb", "https://via.placeholder.com/150"),
             "hasReviewed": row.has_reviewed  # <--- YENİ: Frontend bunu kontrol edecek
         })
-    return history
+    return conditional_response(request, etag, last_modified, history, "private, no-cache")
+
+# Tek ifade: rezervasyon "puanlandı" işaretlenir ve yorum SADECE işaretleme bu istekte yapıldıysa eklenir.
+# Aynı rezervasyon için eşzamanlı iki istekte ikincisi satır kilidini bekler, has_reviewed'ı TRUE görür,
+# yorum eklenmez (eski kontrol-sonra-ekle akışında iki yorum da yazılabiliyordu).
+REVIEW_CREATE_QUERY = text(f"""
+    WITH marked AS (
+        UPDATE reservations SET has_reviewed = TRUE
+        WHERE reservation_id = :rid AND has_reviewed IS NOT TRUE
+        RETURNING reservation_id
+    ), inserted AS (
+        INSERT INTO reviews (user_id, spot_id, rating, comment)
+        SELECT CAST(:uid AS INT), CAST(:sid AS INT), CAST(:rating AS INT), CAST(:comment AS TEXT) FROM marked
+        RETURNING review_id, {WRITE_XID_COLUMN}
+    )
+    SELECT inserted.review_id, inserted.write_xid,
+           EXISTS (SELECT 1 FROM reservations WHERE reservation_id = :rid) AS reservation_exists
+    FROM (SELECT 1) one LEFT JOIN inserted ON TRUE
+""")
 
 @app.post("/api/reviews")
-def create_review(review: ReviewCreate, db: Session = Depends(get_db)):
+async def create_review(review: ReviewCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        # 1. ADIM: Önce bu rezervasyon daha önce puanlanmış mı kontrol et
-        # (Kullanıcı arayüzü geçse bile veritabanı dur desin)
-        check_query = text("SELECT has_reviewed FROM reservations WHERE reservation_id = :rid")
-        is_reviewed = db.execute(check_query, {"rid": review.reservationId}).scalar()
-
-        if is_reviewed:
-             raise HTTPException(status_code=400, detail="Bu rezervasyon zaten puanlanmış!")
-
-        # 2. ADIM: Review tablosuna ekle (Trigger çalışır, puan artar)
-        query = text("""
-            INSERT INTO reviews (user_id, spot_id, rating, comment)
-            VALUES (:uid, :sid, :rating, :comment)
-        """)
-        db.execute(query, {
+        # Review tablosuna ekle (Trigger çalışır, puan artar) + rezervasyonu "Artık puanlandı" (TRUE) yap
+        row = (await db.execute(REVIEW_CREATE_QUERY, {
+            "rid": review.reservationId,
             "uid": review.userId, 
             "sid": review.spotId, 
             "rating": review.rating, 
             "comment": review.comment
-        })
+        })).fetchone()
 
-        # 3. ADIM: KRİTİK NOKTA BURASI! 👇
-        # Reservations tablosunu güncelle: "Artık puanlandı" (TRUE) yap.
-        update_query = text("UPDATE reservations SET has_reviewed = TRUE WHERE reservation_id = :rid")
-        db.execute(update_query, {"rid": review.reservationId})
+        # (Kullanıcı arayüzü geçse bile veritabanı dur desin)
+        if row.review_id is None:
+            await db.rollback()
+            if not row.reservation_exists:
+                raise HTTPException(status_code=404, detail="Rezervasyon bulunamadı.")
+            raise HTTPException(status_code=400, detail="Bu rezervasyon zaten puanlanmış!")
 
-        # Hepsini onayla
-        db.commit()
+        note_write(db, row)
+        await db.commit()
+        invalidate_spots()
         return {"message": "Puan kaydedildi."}
 
     except HTTPException as he:
         raise he
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         # Hata detayını görmek için print ekleyebilirsin
         print(f"Hata detayı: {e}")
         raise HTTPException(status_code=500, detail=f"Hata: {str(e)}")
@@ -338,7 +592,7 @@ def register(user: UserRegister, db: Session = Depends(get_db)):
 # Bu endpointler Admin panelindeki butonlara bağlanacak.
 
 @app.get("/api/admin/analysis/loyal-users")
-def get_loyal_users(db: Session = Depends(get_db)):
+def get_loyal_users(db: Session = Depends(get_read_db)):
     # SENARYO 1: "Gezgin Gurmeler"
     # Birden fazla ( > 1 ) farklı mekana yorum yapmış kullanıcılar.
     # Logic: Reviews tablosunda user_id'ye göre grupla, farklı spot_id sayısına bak.
@@ -355,7 +609,7 @@ def get_loyal_users(db: Session = Depends(get_db)):
     return [{"name": row.username} for row in result]
 
 @app.get("/api/admin/analysis/inactive-users")
-def get_inactive_users(db: Session = Depends(get_db)):
+def get_inactive_users(db: Session = Depends(get_read_db)):
     # SENARYO 2: "Hayalet Kullanıcılar"
     # Sisteme kayıtlı (USERS) ama hiç rezervasyonu (RESERVATIONS) olmayanlar.
     # Logic: (Tüm Kullanıcılar) FARK (Rezervasyon Yapanlar) -> EXCEPT Kullanımı
@@ -368,23 +622,25 @@ def get_inactive_users(db: Session = Depends(get_db)):
     
     return [{"name": row.username} for row in result]
 # --- 10. PROFİL GÜNCELLEME ---
+# Şifre boş/verilmemişse mevcut şifre korunur; e-posta ve rol aynı ifadeden döner
+PROFILE_UPDATE_QUERY = text(f"""
+    UPDATE users SET username = :name, password = COALESCE(:pass, password)
+    WHERE user_id = :uid
+    RETURNING email, role, {WRITE_XID_COLUMN}
+""")
+
 @app.put("/api/profile/update")
-def update_profile(data: UserUpdate, db: Session = Depends(get_db)):
+async def update_profile(data: UserUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
-        check_query = text("SELECT * FROM users WHERE user_id = :uid")
-        user = db.execute(check_query, {"uid": data.userId}).fetchone()
+        user = (await db.execute(PROFILE_UPDATE_QUERY, {
+            "name": data.username, "pass": data.password or None, "uid": data.userId
+        })).fetchone()
         
         if not user:
             raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı.")
 
-        if data.password and len(data.password) > 0:
-            update_query = text("UPDATE users SET username = :name, password = :pass WHERE user_id = :uid")
-            db.execute(update_query, {"name": data.username, "pass": data.password, "uid": data.userId})
-        else:
-            update_query = text("UPDATE users SET username = :name WHERE user_id = :uid")
-            db.execute(update_query, {"name": data.username, "uid": data.userId})
-            
-        db.commit()
+        note_write(db, user)
+        await db.commit()
         
         return {
             "message": "Profil güncellendi.",
@@ -397,13 +653,20 @@ def update_profile(data: UserUpdate, db: Session = Depends(get_db)):
             }
         }
 
+    except HTTPException as he:
+        raise he
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Update hatası: {e}")
         raise HTTPException(status_code=500, detail="Güncelleme sırasında hata oluştu.")
 
 @app.get("/api/spots/{spot_id}/reviews")
-def get_spot_reviews(spot_id: int, db: Session = Depends(get_db)):
+async def get_spot_reviews(request: Request, spot_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    # Koşullu GET: mekanın yorumları (veya kullanıcı adları) değişmediyse 304
+    etag, last_modified = await fetch_version(db, [spot_reviews_resource(spot_id), USERS_RESOURCE])
+    if is_not_modified(request, etag, last_modified):
+        return conditional_response(request, etag, last_modified, None, "public, max-age=0, must-revalidate")
+
     # review_id eklendi 👇
     query = text("""
         SELECT r.review_id, r.rating, r.comment, r.created_at, u.username 
@@ -412,7 +675,7 @@ def get_spot_reviews(spot_id: int, db: Session = Depends(get_db)):
         WHERE r.spot_id = :sid
         ORDER BY r.created_at DESC
     """)
-    result = db.execute(query, {"sid": spot_id}).fetchall()
+    result = (await db.execute(query, {"sid": spot_id})).fetchall()
     
     reviews = []
     for row in result:
@@ -423,71 +686,158 @@ def get_spot_reviews(spot_id: int, db: Session = Depends(get_db)):
             "comment": row.comment,
             "date": row.created_at.strftime("%d.%m.%Y")
         })
-    return reviews
+    return conditional_response(request, etag, last_modified, reviews, "public, max-age=0, must-revalidate")
     
 # --- 12. REZERVASYON İPTAL ET (Status Güncelleme) ---
+CANCEL_RESERVATION_QUERY = text(
+    f"UPDATE reservations SET status = 'İPTAL' WHERE reservation_id = :rid RETURNING reservation_id, {WRITE_XID_COLUMN}"
+)
+
 @app.put("/api/reservations/{reservation_id}/cancel")
-def cancel_reservation(reservation_id: int, db: Session = Depends(get_db)):
-    # 1. Rezervasyonu bul
-    query = text("SELECT * FROM reservations WHERE reservation_id = :rid")
-    reservation = db.execute(query, {"rid": reservation_id}).fetchone()
+async def cancel_reservation(reservation_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Durumu 'İPTAL' olarak güncelle; satır dönmediyse rezervasyon yok
+    cancelled = (await db.execute(CANCEL_RESERVATION_QUERY, {"rid": reservation_id})).fetchone()
 
-    if not reservation:
+    if cancelled is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Rezervasyon bulunamadı.")
     
-    # 2. Durumu 'İPTAL' olarak güncelle
-    update_query = text("UPDATE reservations SET status = 'İPTAL' WHERE reservation_id = :rid")
-    db.execute(update_query, {"rid": reservation_id})
-    db.commit()
+    note_write(db, cancelled)
+    await db.commit()
+    seat_index.remove(reservation_id)
     
     return {"message": "Rezervasyon iptal edildi."}
+# --- 13-15. ADMIN LİSTELERİ (Keyset sayfalama + streaming) ---
+# limit verilirse: {"items": [...], "next_cursor": "..."} döner, sonraki sayfa için cursor=next_cursor gönderilir.
+# limit verilmezse: tüm liste server-side cursor ile parça parça akıtılır (worker belleği şişmez).
+# Tarih formatlama satır başına strftime yerine SQL'de (to_char) yapılıyor.
+
+def _date_range_filter(column: str, date_from: date, date_to: date, where: list, params: dict):
+    if date_from:
+        where.append(f"{column} >= :date_from")
+        params["date_from"] = date_from
+    if date_to:
+        # date_to dahil: ertesi günün başına kadar
+        where.append(f"{column} < :date_to")
+        params["date_to"] = date_to + timedelta(days=1)
+
+def _admin_list(db, select_sql: str, where: list, params: dict, order_cols: tuple, cursor_types: tuple,
+                cursor: str, limit: int, serialize, cursor_key):
+    # order_cols DESC sıralanır; keyset koşulu: (a, b) < (:c0, :c1)
+    if cursor:
+        values = decode_cursor(cursor, *cursor_types)
+        placeholders = ", ".join(f":c{i}" for i in range(len(values)))
+        where.append(f"({', '.join(order_cols)}) < ({placeholders})")
+        params.update({f"c{i}": v for i, v in enumerate(values)})
+    sql = select_sql
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY " + ", ".join(f"{c} DESC" for c in order_cols)
+    if limit is None:
+        return stream_json_array(text(sql), params, serialize, db.get_bind())
+    return keyset_page(db, text(sql + " LIMIT :limit"), params, limit, serialize, cursor_key)
+
 # --- 13. ADMIN: TÜM KULLANICILARI GETİR ---
 @app.get("/api/admin/users")
-def get_all_users(db: Session = Depends(get_db)):
-    query = text("SELECT user_id, username, email, role, created_at FROM users ORDER BY user_id DESC")
-    result = db.execute(query).fetchall()
-    return [{"id": r.user_id, "name": r.username, "email": r.email, "role": r.role, "joined_at": r.created_at.strftime("%d.%m.%Y")} for r in result]
+def get_all_users(
+    role: str = None,
+    date_from: date = None,
+    date_to: date = None,
+    cursor: str = None,
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    where, params = [], {}
+    if role:
+        where.append("role = :role")
+        params["role"] = role
+    _date_range_filter("created_at", date_from, date_to, where, params)
+    return _admin_list(
+        db,
+        "SELECT user_id, username, email, role, to_char(created_at, 'DD.MM.YYYY') as joined_at FROM users",
+        where, params, ("user_id",), (int,), cursor, limit,
+        lambda r: {"id": r.user_id, "name": r.username, "email": r.email, "role": r.role, "joined_at": r.joined_at},
+        lambda r: (r.user_id,)
+    )
 
 # --- 14. ADMIN: TÜM REZERVASYONLARI GETİR ---
 @app.get("/api/admin/reservations")
-def get_all_reservations(db: Session = Depends(get_db)):
-    check_and_update_statuses(db)
-    query = text("""
-        SELECT r.reservation_id, u.username, s.name as spot_name, r.start_time, r.end_time, r.status
-        FROM reservations r
+def get_all_reservations(
+    status: str = None,
+    spot_id: int = None,
+    date_from: date = None,
+    date_to: date = None,
+    cursor: str = None,
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    where, params = [], {}
+    if status:
+        # Filtre de "effective status" üzerinden (süresi dolmuş AKTİF -> TAMAMLANDI)
+        where.append(f"{effective_status_sql('r')} = :status")
+        params["status"] = status
+    if spot_id:
+        where.append("r.spot_id = :spot_id")
+        params["spot_id"] = spot_id
+    _date_range_filter("r.start_time", date_from, date_to, where, params)
+    return _admin_list(
+        db,
+        f"""
+        SELECT r.reservation_id, u.username, s.name as spot_name, r.start_time,
+               to_char(r.start_time, 'DD.MM.YYYY') as date_str,
+               to_char(r.start_time, 'HH24:MI') || ' - ' || to_char(r.end_time, 'HH24:MI') as time_str,
+               {effective_status_sql("r")} as status
+        FROM reservations_all r
         JOIN users u ON r.user_id = u.user_id
         JOIN study_spots s ON r.spot_id = s.spot_id
-        ORDER BY r.start_time DESC
-    """)
-    result = db.execute(query).fetchall()
-    return [{
-        "id": r.reservation_id,
-        "user": r.username,
-        "spot": r.spot_name,
-        "date": r.start_time.strftime("%d.%m.%Y"),
-        "time": f"{r.start_time.strftime('%H:%M')} - {r.end_time.strftime('%H:%M')}",
-        "status": r.status
-    } for r in result]
+        """,
+        where, params, ("r.start_time", "r.reservation_id"), (datetime, int), cursor, limit,
+        lambda r: {
+            "id": r.reservation_id,
+            "user": r.username,
+            "spot": r.spot_name,
+            "date": r.date_str,
+            "time": r.time_str,
+            "status": r.status
+        },
+        lambda r: (r.start_time, r.reservation_id)
+    )
 
 # --- 15. ADMIN: TÜM YORUMLARI GETİR ---
 @app.get("/api/admin/reviews")
-def get_all_reviews(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT r.review_id, u.username, s.name as spot_name, r.rating, r.comment, r.created_at
+def get_all_reviews(
+    spot_id: int = None,
+    date_from: date = None,
+    date_to: date = None,
+    cursor: str = None,
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    where, params = [], {}
+    if spot_id:
+        where.append("r.spot_id = :spot_id")
+        params["spot_id"] = spot_id
+    _date_range_filter("r.created_at", date_from, date_to, where, params)
+    return _admin_list(
+        db,
+        """
+        SELECT r.review_id, u.username, s.name as spot_name, r.rating, r.comment, r.created_at,
+               to_char(r.created_at, 'DD.MM.YYYY') as date_str
         FROM reviews r
         JOIN users u ON r.user_id = u.user_id
         JOIN study_spots s ON r.spot_id = s.spot_id
-        ORDER BY r.created_at DESC
-    """)
-    result = db.execute(query).fetchall()
-    return [{
-        "id": r.review_id,
-        "user": r.username,
-        "spot": r.spot_name,
-        "rating": r.rating,
-        "comment": r.comment,
-        "date": r.created_at.strftime("%d.%m.%Y")
-    } for r in result]
+        """,
+        where, params, ("r.created_at", "r.review_id"), (datetime, int), cursor, limit,
+        lambda r: {
+            "id": r.review_id,
+            "user": r.username,
+            "spot": r.spot_name,
+            "rating": r.rating,
+            "comment": r.comment,
+            "date": r.date_str
+        },
+        lambda r: (r.created_at, r.review_id)
+    )
 
 # --- 16. ADMIN: YORUM SİL (MODERASYON) ---
 @app.delete("/api/admin/reviews/{review_id}")
@@ -496,94 +846,240 @@ def delete_review(review_id: int, db: Session = Depends(get_db)):
     # Genelde False yapılabilir ama şimdilik sadece yorumu siliyoruz.
     db.execute(text("DELETE FROM reviews WHERE review_id = :rid"), {"rid": review_id})
     db.commit()
+    invalidate_spots()
     return {"message": "Yorum silindi."}
 
-# --- ANALİZ FONKSİYONLARINI GÜNCELLE (User ID yerine İSİM Dönsün) ---
+# --- 9B. ADMIN KOHORT ANALİZİ (Bellekteki mekan-kullanıcı bitmap'leri üzerinde küme işlemleri) ---
+# expr: mekan ID'leri ile | (birleşim), & (kesişim), - (fark) ve parantez. Örn: "(1 | 2) - 3"
+# veya spot_ids=1,2,3 + op=union|intersect|except (except: ilk mekan, diğerlerinin hiçbiri)
+USER_NAMES_QUERY = text("""
+    SELECT user_id, username FROM users WHERE user_id = ANY(CAST(:ids AS INT[])) ORDER BY user_id
+""")
+
+def _cohort(db: Session, expr: str, limit: int = None):
+    try:
+        key, bitmap, count = cohort_index.evaluate(expr)
+    except ExpressionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ids = bitmap_to_ids(bitmap)
+    if limit is not None:
+        ids = ids[:limit]
+    rows = db.execute(USER_NAMES_QUERY, {"ids": ids.tolist()}).fetchall() if len(ids) else []
+    return key, count, rows
+
+@app.get("/api/admin/analysis/cohort")
+def get_cohort_analysis(
+    expr: str = None,
+    spot_ids: str = None,
+    op: str = "union",
+    limit: int = Query(100, ge=0, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    if not expr:
+        if not spot_ids:
+            raise HTTPException(status_code=400, detail="expr veya spot_ids parametresi gerekli.")
+        try:
+            ids = [int(s) for s in spot_ids.split(",") if s.strip()]
+            expr = build_expression(ids, op)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e) if isinstance(e, ExpressionError) else "spot_ids virgülle ayrılmış sayılar olmalı.")
+    key, count, rows = _cohort(db, expr, limit)
+    return {
+        "expression": key,
+        "count": count,
+        "users": [{"id": r.user_id, "name": r.username} for r in rows],
+        "truncated": count > len(rows)
+    }
+
+# Admin panelindeki hazır butonlar (Kütüphane A1 = 1, A2 = 2). Yanıt formatı aynı: [{"name": ...}]
+def _cohort_names(db: Session, expr: str):
+    _, _, rows = _cohort(db, expr)
+    return [{"name": name} for name in sorted({r.username for r in rows})]
 
 @app.get("/api/admin/analysis/union")
-def get_union_analysis(db: Session = Depends(get_db)):
+def get_union_analysis(db: Session = Depends(get_read_db)):
     # UNION: Kütüphane A1 VEYA A2'yi kullananlar
-    query = text("""
-        SELECT u.username FROM reservations r JOIN users u ON r.user_id = u.user_id WHERE r.spot_id = 1 
-        UNION 
-        SELECT u.username FROM reservations r JOIN users u ON r.user_id = u.user_id WHERE r.spot_id = 2
-    """)
-    result = db.execute(query).fetchall()
-    
-    # DİKKAT: Eskiden sadece [row.username] dönüyordu, şimdi [{"name": row.username}] dönüyor.
-    return [{"name": row.username} for row in result]
+    return _cohort_names(db, "1 | 2")
 
 @app.get("/api/admin/analysis/intersect")
-def get_intersect_analysis(db: Session = Depends(get_db)):
+def get_intersect_analysis(db: Session = Depends(get_read_db)):
     # INTERSECT: İkisini de kullananlar
-    query = text("""
-        SELECT u.username FROM reservations r JOIN users u ON r.user_id = u.user_id WHERE r.spot_id = 1 
-        INTERSECT 
-        SELECT u.username FROM reservations r JOIN users u ON r.user_id = u.user_id WHERE r.spot_id = 2
-    """)
-    result = db.execute(query).fetchall()
-    return [{"name": row.username} for row in result]
+    return _cohort_names(db, "1 & 2")
 
 @app.get("/api/admin/analysis/except")
-def get_except_analysis(db: Session = Depends(get_db)):
-    # EXCEPT: Fark kümesi
-    query = text("""
-        SELECT u.username FROM reservations r JOIN users u ON r.user_id = u.user_id WHERE r.spot_id = 1 
-        EXCEPT 
-        SELECT u.username FROM reservations r JOIN users u ON r.user_id = u.user_id WHERE r.spot_id = 2
-    """)
-    result = db.execute(query).fetchall()
-    return [{"name": row.username} for row in result]
+def get_except_analysis(db: Session = Depends(get_read_db)):
+    # EXCEPT: A1'i kullanıp A2'yi hiç kullanmayanlar
+    return _cohort_names(db, "1 - 2")
+
+# --- 9C. ADMIN DOLULUK HEATMAP'İ (mekan x haftanın günü x saat) ---
+# spot_hourly_occupancy özeti (+ henüz katlanmamış değişiklikler) tek sorgu; ham rezervasyonlar taranmaz.
+@app.get("/api/admin/analysis/heatmap")
+def get_occupancy_heatmap(
+    date_from: date = None,
+    date_to: date = None,
+    spot_ids: str = None,
+    db: Session = Depends(get_read_db)
+):
+    try:
+        start, end = heatmap_range(date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        ids = [int(s) for s in spot_ids.split(",") if s.strip()] if spot_ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="spot_ids virgülle ayrılmış sayılar olmalı.")
+    params = {"date_from": start, "date_to": end, "spot_ids": ids}
+    spots = db.execute(HEATMAP_SPOTS_QUERY, params).fetchall()
+    rows = db.execute(HEATMAP_QUERY, params).fetchall()
+    return {
+        "date_from": start.date().isoformat(),
+        "date_to": (end - timedelta(days=1)).date().isoformat(),
+        "weekdays": ["Pazartesi", "Salı", "Çarşamba", "Perşembe", "Cuma", "Cumartesi", "Pazar"],
+        "hours": list(range(24)),
+        "spots": build_heatmap(spots, rows, start, end)
+    }
 
     # --- 17. DOLU KOLTUKLARI GETİR ---
-@app.get("/api/spots/{spot_id}/occupied")
-def get_occupied_seats(spot_id: int, date: str, start: str, end: str, db: Session = Depends(get_db)):
-    # Belirtilen tarih ve saat aralığında o mekandaki dolu koltuk numaralarını döndürür.
-    # Frontend'den gelen format: date="2023-12-01", start="14:00", end="15:00"
-    check_and_update_statuses(db)
-    start_dt = f"{date} {start}:00"
-    end_dt = f"{date} {end}:00"
-    
-    query = text("""
-        SELECT seat_number FROM reservations 
-        WHERE spot_id = :sid 
-        AND status != 'İPTAL'
-        AND (start_time < :end_dt AND end_time > :start_dt)
-    """)
-    
-    result = db.execute(query, {"sid": spot_id, "start_dt": start_dt, "end_dt": end_dt}).fetchall()
-    
+OCCUPIED_SEATS_QUERY = text("""
+    SELECT seat_number FROM reservations 
+    WHERE spot_id = :sid 
+    AND status != 'İPTAL'
+    AND (start_time < :end_dt AND end_time > :start_dt)
+    AND start_time > CAST(:start_dt AS TIMESTAMP) - INTERVAL '24 hours'
+""")
+
+async def _occupied_seats(db: AsyncSession, spot_id: int, start_ts: datetime, end_ts: datetime):
+    # Önce bellekteki indeks; indeksin kapsamadığı (eski) tarihler DB'ye düşer
+    # Not: Süresi dolan kayıtlar İPTAL olmadığı için doluluğu etkilemez, burada status güncellemeye gerek yok
+    if seat_index.covers(start_ts):
+        return seat_index.occupied_seats(spot_id, start_ts, end_ts)
+    result = (await db.execute(OCCUPIED_SEATS_QUERY, {"sid": spot_id, "start_dt": start_ts, "end_dt": end_ts})).fetchall()
     # Dolu koltukların listesini döndür [1, 3, 5] gibi
     return [row.seat_number for row in result]
 
+def _parse_window(date: str, start: str, end: str):
+    # Frontend'den gelen format: date="2023-12-01", start="14:00", end="15:00"
+    start_ts, end_ts = parse_ts(f"{date} {start}:00"), parse_ts(f"{date} {end}:00")
+    if start_ts is None or end_ts is None:
+        raise HTTPException(status_code=400, detail="Geçersiz tarih/saat formatı.")
+    return start_ts, end_ts
+
+@app.get("/api/spots/{spot_id}/occupied")
+async def get_occupied_seats(spot_id: int, date: str, start: str, end: str, db: AsyncSession = Depends(get_async_read_db)):
+    # Belirtilen tarih ve saat aralığında o mekandaki dolu koltuk numaralarını döndürür.
+    start_ts, end_ts = _parse_window(date, start, end)
+    return await _occupied_seats(db, spot_id, start_ts, end_ts)
+
+# --- 17B. GÜN BOYU KOLTUK DOLULUK MATRİSİ ---
+@app.get("/api/spots/{spot_id}/availability")
+async def get_spot_availability(spot_id: int, date: date, slot: str = "30m", db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Tüm gün için koltuk x zaman dilimi doluluk matrisi (tek sorgu + NumPy ile boyama).
+    occupancy: {"koltuk_no": base64 bitset} -> bit i = i. dilim (MSB önce), 1 = dolu
+    Örn: slot=30m -> 48 dilim -> koltuk başına 6 byte.
+    """
+    try:
+        slot_minutes = parse_slot(slot)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    day_start, day_end = day_bounds(date)
+    rows = (await db.execute(DAY_RESERVATIONS_QUERY, {
+        "sid": spot_id, "day_start": day_start, "day_end": day_end
+    })).fetchall()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Mekan bulunamadı.")
+
+    capacity = rows[0].capacity
+    intervals = [(r.seat_number, r.start_time, r.end_time) for r in rows if r.seat_number is not None]
+    grid = occupancy_grid(capacity, intervals, day_start, slot_minutes)
+    return {
+        "spot_id": spot_id,
+        "date": date.isoformat(),
+        "slotMinutes": slot_minutes,
+        "slots": grid.shape[1],
+        "seats": capacity,
+        "encoding": "base64-bitset-msb",
+        "occupancy": encode_grid(grid)
+    }
+
+# --- 17C. CANLI KOLTUK DOLULUĞU (Server-Sent Events) ---
+# SpotDetail seçili pencere için /occupied'ı tekrar sorgulamak yerine buna bağlanır:
+# event: snapshot -> {"occupied": [...]}, event: delta -> {"occupied": [...], "released": [...]},
+# event: spot -> {"available": false} (bakıma alındı). Olaylar Postgres LISTEN/NOTIFY ile gelir (live.py).
+@app.get("/api/spots/{spot_id}/occupancy/stream")
+async def stream_occupancy(spot_id: int, date: str, start: str, end: str, request: Request):
+    start_ts, end_ts = _parse_window(date, start, end)
+
+    async def load_occupied():
+        # Akış saatlerce açık kalabilir: istek başına session tutulmaz, gerektiğinde kısa süreli açılır
+        if seat_index.covers(start_ts):
+            return seat_index.occupied_seats(spot_id, start_ts, end_ts)
+        async with AsyncReadSessionLocal() as db:
+            return await _occupied_seats(db, spot_id, start_ts, end_ts)
+
+    return StreamingResponse(
+        occupancy_events(request, spot_id, start_ts, end_ts, load_occupied),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- 18. SQL FONKSİYONLARI KULLANAN ENDPOINT'LER ---
 
-# FONKSIYON 1: get_spot_history (CURSOR ve RECORD ile)
+# FONKSIYON 1: get_spot_history (set tabanlı, keyset sayfalı)
+# limit verilirse: {"items": [...], "next_cursor": "..."}; verilmezse tüm liste akıtılır (admin listeleri gibi).
+SPOT_HISTORY_QUERY = """
+    SELECT * FROM get_spot_history(CAST(:spot_id AS INT), CAST(:date_from AS TIMESTAMP), CAST(:date_to AS TIMESTAMP),
+                                   CAST(:c0 AS TIMESTAMP), CAST(:c1 AS INT), CAST(:limit AS INT))
+"""
+
+def _history_row(row):
+    return {
+        "username": row.r_user,
+        "start_time": row.r_start.strftime("%d.%m.%Y %H:%M") if row.r_start else None,
+        "status": row.r_status
+    }
+
 @app.get("/api/spots/{spot_id}/history")
-def get_spot_history_endpoint(spot_id: int, db: Session = Depends(get_db)):
+def get_spot_history_endpoint(
+    spot_id: int,
+    date_from: date = None,
+    date_to: date = None,
+    cursor: str = None,
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
     """
-    Bir mekanın tüm geçmiş rezervasyonlarını CURSOR ve RECORD kullanan SQL fonksiyonu ile döndürür.
-    Fonksiyon adı: get_spot_history(p_spot_id INT)
+    Bir mekanın geçmiş rezervasyonlarını (yeniden eskiye) set tabanlı SQL fonksiyonu ile döndürür.
+    Fonksiyon adı: get_spot_history(p_spot_id, p_from, p_to, p_before_start, p_before_id, p_limit)
     """
-    try:
-        query = text("SELECT * FROM get_spot_history(:spot_id)")
-        result = db.execute(query, {"spot_id": spot_id}).fetchall()
-        
-        history = []
-        for row in result:
-            history.append({
-                "username": row.r_user,
-                "start_time": row.r_start.strftime("%d.%m.%Y %H:%M") if row.r_start else None,
-                "status": row.r_status
-            })
-        return history
-    except Exception as e:
-        print(f"Hata: {e}")
-        return {"error": str(e)}
+    params = {
+        "spot_id": spot_id,
+        "date_from": date_from,
+        "date_to": date_to + timedelta(days=1) if date_to else None,  # date_to dahil
+        "c0": None,
+        "c1": None,
+        "limit": None
+    }
+    if cursor:
+        params["c0"], params["c1"] = decode_cursor(cursor, datetime, int)
+    if limit is None:
+        return stream_json_array(text(SPOT_HISTORY_QUERY), params, _history_row, db.get_bind())
+    return keyset_page(db, text(SPOT_HISTORY_QUERY), params, limit, _history_row,
+                       lambda r: (r.r_start, r.r_id))
 
 # FONKSIYON 2: calculate_study_hours (Parametre alan hesaplama fonksiyonu)
+def _study_hours(user_id, total_hours):
+    total_hours = float(total_hours) if total_hours else 0
+    return {
+        "user_id": user_id,
+        "total_study_hours": round(total_hours, 2),
+        "total_study_minutes": int(total_hours * 60),
+        "message": f"Toplam çalışma süresi: {int(total_hours)} saat {int((total_hours % 1) * 60)} dakika"
+    }
+
 @app.get("/api/users/{user_id}/study-hours")
-def get_study_hours_endpoint(user_id: int, db: Session = Depends(get_db)):
+def get_study_hours_endpoint(user_id: int, db: Session = Depends(get_read_db)):
     """
     Bir kullanıcının toplam çalışma saatini hesaplayan SQL fonksiyonu.
     Fonksiyon adı: calculate_study_hours(p_user_id INT)
@@ -592,18 +1088,42 @@ def get_study_hours_endpoint(user_id: int, db: Session = Depends(get_db)):
     try:
         query = text("SELECT calculate_study_hours(:user_id) as total_hours")
         result = db.execute(query, {"user_id": user_id}).fetchone()
-        
-        total_hours = float(result.total_hours) if result.total_hours else 0
-        return {
-            "user_id": user_id,
-            "total_study_hours": round(total_hours, 2),
-            "total_study_minutes": int(total_hours * 60),
-            "message": f"Toplam çalışma süresi: {int(total_hours)} saat {int((total_hours % 1) * 60)} dakika"
-        }
+        return _study_hours(user_id, result.total_hours)
     except Exception as e:
         print(f"Hata: {e}")
         return {"error": str(e)}
 
+# FONKSIYON 2B: get_study_hours (çok kullanıcı tek sorgu)
+# Profil listeleri kullanıcı başına ayrı istek atmak yerine: /api/users/study-hours?user_ids=1,2,3
+@app.get("/api/users/study-hours")
+def get_study_hours_batch(user_ids: str, db: Session = Depends(get_read_db)):
+    try:
+        ids = sorted({int(s) for s in user_ids.split(",") if s.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="user_ids virgülle ayrılmış sayılar olmalı.")
+    if not ids or len(ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"1 ile {MAX_PAGE_SIZE} arası kullanıcı ID'si verilmeli.")
+    rows = db.execute(
+        text("SELECT r_user_id, r_hours FROM get_study_hours(CAST(:ids AS INT[])) ORDER BY r_user_id"),
+        {"ids": ids}
+    ).fetchall()
+    return [_study_hours(r.r_user_id, r.r_hours) for r in rows]
+
+# Liderlik tablosu: en çok çalışan ilk N kullanıcı
+@app.get("/api/leaderboard/study-hours")
+def get_study_hours_leaderboard(limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_read_db)):
+    rows = db.execute(text("""
+        SELECT r_user_id, r_username, r_hours
+        FROM get_study_hours()
+        WHERE r_hours > 0
+        ORDER BY r_hours DESC, r_user_id
+        LIMIT :limit
+    """), {"limit": limit}).fetchall()
+    return [
+        {"rank": i, "username": r.r_username, **_study_hours(r.r_user_id, r.r_hours)}
+        for i, r in enumerate(rows, start=1)
+    ]
+
 # FONKSIYON 3: check_availability (Mekan ve saat kontrolü)
 @app.get("/api/spots/{spot_id}/check-available")
 def check_spot_available_endpoint(
@@ -611,7 +1131,7 @@ def check_spot_available_endpoint(
     start: str = None,
     end: str = None,
     seat_number: int = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Belirtilen mekan, saat aralığı ve koltuk numarasının müsait olup olmadığını kontrol eder.
@@ -620,6 +1140,16 @@ def check_spot_available_endpoint(
         if not start or not end or not seat_number:
             raise HTTPException(status_code=400, detail="start, end, seat_number parametreleri gerekli!")
         
+        start_ts, end_ts = parse_ts(start), parse_ts(end)
+        if seat_index.covers(start_ts) and end_ts is not None:
+            is_available = not seat_index.is_occupied(spot_id, int(seat_number), start_ts, end_ts)
+            return {
+                "spot_id": spot_id,
+                "seat_number": seat_number,
+                "is_available": is_available,
+                "message": f"{seat_number} numaralı koltuk {'müsait ✅' if is_available else 'dolu ❌'}"
+            }
+
         # Doğrudan SQL sorgusu - çakışma varsa True, yoksa False dön
         query = text("""
             SELECT COUNT(*) as conflict_count
@@ -628,6 +1158,7 @@ def check_spot_available_endpoint(
               AND seat_number = :seat_number
               AND status != 'İPTAL'
               AND (start_time, end_time) OVERLAPS (CAST(:start AS TIMESTAMP), CAST(:end AS TIMESTAMP))
+              AND start_time > CAST(:start AS TIMESTAMP) - INTERVAL '24 hours'
         """)
         
         result = db.execute(query, {
@@ -652,4 +1183,35 @@ def check_spot_available_endpoint(
         print(f"check_availability Hatası: {e}")
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Hata: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Hata: {str(e)}")
+
+# --- 19. ADMIN: VERİ DIŞA AKTARMA (EXPORT) ---
+# Aylık raporlar için tüm rezervasyon/yorum verisini CSV (COPY TO STDOUT) veya NDJSON olarak akıtır.
+
+def _validate_export_format(format: str):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format şunlardan biri olmalı: {', '.join(EXPORT_FORMATS)}")
+
+@app.get("/api/admin/export/reservations")
+def export_reservations(
+    format: str = "csv",
+    spot_id: int = None,
+    date_from: date = None,
+    date_to: date = None
+):
+    _validate_export_format(format)
+    sql, params = build_export_query(RESERVATIONS_EXPORT_SQL, "r", "start_time", "start_time",
+                                     spot_id, date_from, date_to)
+    return export_response(sql, params, format, "reservations")
+
+@app.get("/api/admin/export/reviews")
+def export_reviews(
+    format: str = "csv",
+    spot_id: int = None,
+    date_from: date = None,
+    date_to: date = None
+):
+    _validate_export_format(format)
+    sql, params = build_export_query(REVIEWS_EXPORT_SQL, "rv", "created_at", "created_at",
+                                     spot_id, date_from, date_to)
+    return export_response(sql, params, format, "reviews")
@@ -0,0 +1,87 @@
+# manage.py
+# Bakım komutları. Kullanım: python manage.py <komut>
+#   rebuild-ratings      : study_spots puan özetlerini reviews tablosundan yeniden hesaplar
+#   rebuild-heatmap      : saatlik doluluk özetini (spot_hourly_occupancy) baştan hesaplar
+#   rebuild-study-hours  : kullanıcı çalışma süresi toplamlarını (user_study_totals) baştan hesaplar
+#   ensure-partitions    : reservations için eksik aylık partition'ları açar
+#   archive-reservations : eski ayların partition'larını reservations_archive'a taşır
+import argparse
+
+from sqlalchemy import text
+
+from database import SessionLocal, engine
+from partitions import RESERVATION_PARTITION_MONTHS_AHEAD, ensure_partitions, archive_partitions
+
+
+def rebuild_ratings(args):
+    db = SessionLocal()
+    try:
+        fixed = db.execute(text("SELECT rebuild_spot_rating_stats()")).scalar()
+        db.commit()
+        print(f"Puan özetleri yeniden hesaplandı. Düzeltilen mekan sayısı: {fixed}")
+    finally:
+        db.close()
+
+
+def rebuild_heatmap(args):
+    db = SessionLocal()
+    try:
+        buckets = db.execute(text("SELECT rebuild_spot_occupancy()")).scalar()
+        db.commit()
+        print(f"Doluluk özeti yeniden hesaplandı. Kova sayısı: {buckets}")
+    finally:
+        db.close()
+
+
+def rebuild_study_hours(args):
+    db = SessionLocal()
+    try:
+        users = db.execute(text("SELECT rebuild_user_study_totals()")).scalar()
+        db.commit()
+        print(f"Çalışma süresi toplamları yeniden hesaplandı. Kullanıcı sayısı: {users}")
+    finally:
+        db.close()
+
+
+def ensure_partitions_cmd(args):
+    created = ensure_partitions(args.months_ahead)
+    print(f"Açılan partition sayısı: {created}")
+
+
+def archive_reservations(args):
+    names = archive_partitions(args.keep_months, args.drop_cancelled)
+    if not names:
+        print("Arşivlenecek partition yok.")
+        return
+    if args.drop_cancelled:
+        # İPTAL kayıtları silinen partition'ların dosyalarını küçült (VACUUM transaction içinde çalışmaz)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for name in names:
+                conn.execute(text(f'VACUUM FULL ANALYZE "{name}"'))
+    print(f"Arşivlenen partition'lar: {', '.join(names)}")
+
+
+COMMANDS = {
+    "rebuild-ratings": rebuild_ratings,
+    "rebuild-heatmap": rebuild_heatmap,
+    "rebuild-study-hours": rebuild_study_hours,
+    "ensure-partitions": ensure_partitions_cmd,
+    "archive-reservations": archive_reservations,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StudyFlow bakım komutları")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--months-ahead", type=int, default=RESERVATION_PARTITION_MONTHS_AHEAD,
+                        help="ensure-partitions: kaç ay ilerisine kadar partition açılsın")
+    parser.add_argument("--keep-months", type=int, default=24,
+                        help="archive-reservations: son kaç ay sıcak tabloda kalsın")
+    parser.add_argument("--drop-cancelled", action="store_true",
+                        help="archive-reservations: arşivlenen aylardaki İPTAL kayıtları sil ve sıkıştır")
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
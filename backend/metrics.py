@@ -0,0 +1,235 @@
+# metrics.py
+# Gözlemlenebilirlik: endpoint ve SQL sorgusu gecikmeleri, istek başına sorgu sayısı,
+# yavaş sorgu logu ve bağlantı havuzu durumu. /metrics endpoint'i Prometheus text formatında sunar.
+# Harici kütüphane kullanılmıyor; sayaçlar process içinde (worker başına) tutulur.
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger("studyflow.sql")
+
+# Bu süreyi (ms) aşan SQL ifadeleri parametreleri gizlenerek loglanır
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket sayıları..., toplam, adet]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            base = _labels(self.label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(names, values)
+    )
+
+
+REQUEST_LATENCY = Histogram(
+    "studyflow_http_request_duration_seconds", "HTTP istek süresi (route ve status bazında)",
+    ("method", "route", "status"), LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram(
+    "studyflow_http_request_db_queries", "İstek başına çalışan SQL ifadesi sayısı",
+    ("route",), QUERY_COUNT_BUCKETS)
+QUERY_LATENCY = Histogram(
+    "studyflow_db_query_duration_seconds", "SQL ifadesi süresi (ifade türü bazında)",
+    ("engine", "operation"), LATENCY_BUCKETS)
+SLOW_QUERIES = Counter(
+    "studyflow_db_slow_queries_total", f"{SLOW_QUERY_MS:g} ms eşiğini aşan SQL ifadeleri",
+    ("engine", "operation"))
+
+# Ek metrikler kaydedilebilsin (örn. booking çakışma sayaçları)
+REGISTRY = [REQUEST_LATENCY, REQUEST_QUERIES, QUERY_LATENCY, SLOW_QUERIES]
+_gauge_callbacks = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def register_gauges(callback):
+    """callback() -> [(isim, yardım, {etiketler: değer})]; /metrics çağrıldığında okunur."""
+    _gauge_callbacks.append(callback)
+
+
+# --- İstek bağlamı (istek başına sorgu sayısı) ---
+class RequestStats:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries = 0
+
+
+_current_request = contextvars.ContextVar("studyflow_request_stats", default=None)
+
+
+class MetricsMiddleware:
+    """Saf ASGI middleware: route şablonu + status bazında gecikme ve sorgu sayısı kaydeder."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Router eşleşen route'u scope'a yazar -> "/api/spots/{spot_id}/occupied" gibi şablon
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.observe((scope["method"], route, status["code"]), elapsed)
+            REQUEST_QUERIES.observe((route,), stats.queries)
+            _current_request.reset(token)
+
+
+# --- SQLAlchemy hook'ları ---
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+def _redact(parameters, executemany: bool):
+    # Değerler loglanmaz, sadece tipleri (şifre, e-posta vb. sızmasın)
+    if executemany:
+        return f"<{len(parameters)} parametre seti>"
+    if isinstance(parameters, dict):
+        return {k: f"<{type(v).__name__}>" for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [f"<{type(v).__name__}>" for v in parameters]
+    return "<?>"
+
+
+def instrument_engine(engine, name: str):
+    """Senkron engine veya AsyncEngine.sync_engine'e zamanlama hook'larını bağlar."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("studyflow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("studyflow_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        operation = _operation(statement)
+        QUERY_LATENCY.observe((name, operation), elapsed)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.queries += 1
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES.inc((name, operation))
+            logger.warning(
+                "[SLOW QUERY] %.1f ms | %s | params=%s",
+                elapsed * 1000, _WHITESPACE.sub(" ", statement).strip()[:1000], _redact(parameters, executemany)
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # Hatalı ifadede after_cursor_execute çalışmaz, başlangıç zamanı yığında kalmasın
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("studyflow_query_start"):
+            conn.info["studyflow_query_start"].pop()
+
+
+def pool_gauges(engines: dict):
+    def collect():
+        checked_out, size, overflow = {}, {}, {}
+        for name, engine in engines.items():
+            pool = engine.pool
+            checked_out[(name,)] = pool.checkedout()
+            size[(name,)] = pool.size()
+            overflow[(name,)] = max(pool.overflow(), 0)  # dolmamış havuzda negatif döner
+        return [
+            ("studyflow_db_pool_checked_out", "Kullanımdaki bağlantı sayısı", checked_out),
+            ("studyflow_db_pool_size", "Havuz boyutu", size),
+            ("studyflow_db_pool_overflow", "Havuz üstü açılmış ek bağlantı sayısı", overflow),
+        ]
+    return collect
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for callback in _gauge_callbacks:
+        for name, help_text, values in callback():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(values.items()):
+                label_str = _labels(("engine",), labels) if labels else ""
+                lines.append(f"{name}{{{label_str}}} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,66 @@
+# pagination.py
+# Admin liste endpoint'leri için keyset (cursor) sayfalama ve server-side cursor ile streaming.
+# OFFSET yerine "son görülen sıralama anahtarından sonrası" sorgulanır -> her sayfa indeks ile O(limit).
+import base64
+import json
+import os
+from datetime import datetime
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from database import engine
+
+# Streaming modunda DB'den kaçar satır çekilip tek parça halinde gönderilsin
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+
+def encode_cursor(*values) -> str:
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+
+
+def decode_cursor(cursor: str, *types):
+    """Cursor'ı çözer ve değerleri verilen tiplere çevirir (datetime veya int)."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(raw) != len(types):
+            raise ValueError
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(raw, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Geçersiz cursor.")
+
+
+def keyset_page(db, query, params: dict, limit: int, serialize, cursor_key):
+    """
+    limit+1 satır çekip bir sonraki sayfa olup olmadığını anlar.
+    cursor_key(row) -> sonraki sayfanın başlayacağı sıralama anahtarı (tuple)
+    """
+    rows = db.execute(query, {**params, "limit": limit + 1}).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*cursor_key(rows[-1]))
+    return {"items": [serialize(r) for r in rows], "next_cursor": next_cursor}
+
+
+def stream_json_array(query, params: dict, serialize, bind=None) -> StreamingResponse:
+    """
+    Tüm sonucu belleğe almadan JSON dizi olarak akıtır (server-side cursor).
+    Request'in session'ı response gönderilirken kapanmış olabileceği için kendi bağlantısını açar.
+    bind: bağlantının açılacağı engine (varsayılan primary; okuma endpoint'leri session'ın engine'ini verir)
+    """
+    def generate():
+        with (bind or engine).connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE).execute(query, params)
+            yield b"["
+            first = True
+            for rows in result.partitions():
+                chunk = ",".join(json.dumps(serialize(r), ensure_ascii=False, default=str, separators=(",", ":")) for r in rows)
+                if not first:
+                    chunk = "," + chunk
+                first = False
+                yield chunk.encode()
+            yield b"]"
+
+    return StreamingResponse(generate(), media_type="application/json")
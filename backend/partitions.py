@@ -0,0 +1,59 @@
+# partitions.py
+# reservations tablosu start_time'a göre aylık partition'lı (bkz. database/setup.sql).
+# Gelecek ayların partition'ları önceden açılmazsa yeni kayıtlar reservations_default'a düşer
+# (çalışır ama pruning'den faydalanmaz). Bu modül açılışta ve sweeper döngüsünde partition'ları açar.
+import os
+import time
+
+from sqlalchemy import text
+
+from database import SessionLocal
+
+# Kaç ay ilerisine kadar partition hazır tutulsun
+RESERVATION_PARTITION_MONTHS_AHEAD = int(os.getenv("RESERVATION_PARTITION_MONTHS_AHEAD", "12"))
+# Sweeper kaç saniyede bir kontrol etsin (ay başında yeni partition gerekir, sık kontrol gereksiz)
+RESERVATION_PARTITION_CHECK_INTERVAL = float(os.getenv("RESERVATION_PARTITION_CHECK_INTERVAL", "3600"))
+
+_last_check = 0.0
+
+
+def ensure_partitions(months_ahead: int = RESERVATION_PARTITION_MONTHS_AHEAD) -> int:
+    """Eksik partition'ları açar, açılan sayısını döndürür."""
+    db = SessionLocal()
+    try:
+        created = db.execute(
+            text("SELECT ensure_reservation_partitions(:months)"), {"months": months_ahead}
+        ).scalar()
+        db.commit()
+        return created
+    except Exception as e:
+        db.rollback()
+        print(f"Partition kontrolü başarısız: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+def maybe_ensure_partitions():
+    # Sweeper döngüsünden çağrılır; aralık dolmadıysa bir şey yapmaz
+    global _last_check
+    if time.monotonic() - _last_check >= RESERVATION_PARTITION_CHECK_INTERVAL:
+        ensure_partitions()
+        _last_check = time.monotonic()
+
+
+def archive_partitions(keep_months: int, drop_cancelled: bool = False) -> list:
+    """keep_months aydan eski partition'ları reservations_archive'a taşır, isimlerini döndürür."""
+    db = SessionLocal()
+    try:
+        names = [r[0] for r in db.execute(
+            text("SELECT archive_reservation_partitions(:keep, :drop)"),
+            {"keep": keep_months, "drop": drop_cancelled},
+        )]
+        db.commit()
+        return names
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -1,5 +1,5 @@
 # backend/schemas.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 
 # --- Gelen Veri Modelleri (Frontend -> Backend) ---
@@ -11,6 +11,32 @@ class ReservationCreate(BaseModel):
     end: str
     seatNumber: int
 
+# Tekrarlayan rezervasyon kuralı. Örn: 3 nolu koltuk, her Pzt/Çar 14:00-16:00, 10 hafta
+class RecurrenceRule(BaseModel):
+    userId: int
+    spotId: int
+    seatNumber: int
+    startDate: str            # "2024-02-05" (ilk haftanın başladığı gün)
+    weeks: int = Field(ge=1, le=52)                                   # kaç hafta tekrar edecek (en fazla 1 yıl)
+    weekdays: List[int] = Field(min_length=1, max_length=7)           # 0=Pazartesi ... 6=Pazar
+    startTime: str            # "14:00"
+    endTime: str              # "16:00"
+
+    @field_validator("weekdays")
+    @classmethod
+    def _check_weekdays(cls, value):
+        if any(day < 0 or day > 6 for day in value):
+            raise ValueError("Gün değerleri 0 (Pazartesi) ile 6 (Pazar) arasında olmalı.")
+        if len(set(value)) != len(value):
+            raise ValueError("Aynı gün birden fazla kez seçilemez.")
+        return value
+
+# Toplu rezervasyon: liste ve/veya tekrar kuralı tek istekte, tek transaction'da
+class ReservationBatchCreate(BaseModel):
+    reservations: List[ReservationCreate] = []
+    recurrence: Optional[RecurrenceRule] = None
+    allOrNothing: bool = False  # True ise tek bir çakışmada hiçbiri kaydedilmez
+
 # İŞTE DÜZELTME BURADA: Tek ve net bir SpotCreate tanımı.
 # features kesinlikle List[str] (Liste) olmalı.
 class SpotCreate(BaseModel):
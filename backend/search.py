@@ -0,0 +1,24 @@
+# search.py
+# Mekan araması yardımcıları (Navbar arama kutusu -> /api/spots?q=...)
+# Arama study_spots.search_text (isim + özellikler, Türkçe katlanmış) üzerinde pg_trgm GIN indeksi ile yapılır.
+
+# setup.sql'deki tr_fold() fonksiyonunun Python karşılığı. İkisi aynı kalmalı.
+_TR_FOLD = str.maketrans("İIıŞşĞğÜüÖöÇç", "iiissgguuoocc")
+
+
+def fold_turkish(value: str) -> str:
+    # Önce Türkçe harfleri çevir: Python'da "İ".lower() -> "i̇" (noktalı birleşik karakter) olur
+    return value.translate(_TR_FOLD).lower()
+
+
+def like_escape(value: str) -> str:
+    # Kullanıcının yazdığı %, _ ve \\ karakterleri joker olarak yorumlanmasın
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def normalize_query(q: str):
+    """Boşlukları sadeleştirip katlar. Boş arama -> None (tüm katalog)."""
+    if not q:
+        return None
+    folded = " ".join(fold_turkish(q).split())
+    return folded or None
@@ -0,0 +1,236 @@
+# seat_index.py
+# Mekan/koltuk bazlı, bellekte tutulan rezervasyon aralık indeksi.
+# /occupied, /check-available ve create_reservation çakışma kontrolü her istekte
+# Postgres'e overlap sorgusu atmak yerine buradan (bisect ile) cevaplanır.
+# Son karar yine veritabanındadır: INSERT sırasında DB kısıtları çakışmayı reddeder.
+# İndeks worker'a özel: diğer worker'ların yazmaları LISTEN 'seat_events' (live.py) ile anında, o bağlantı
+# yokken sadece periyodik tam yüklemeyle gelir. Bu durumda indeks SEAT_INDEX_MAX_AGE'den eskiyse
+# sorgular DB'ye düşer (başka worker'da alınmış koltuk boş görünmesin).
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import SessionLocal
+
+# Geçmişe dönük kaç saatlik rezervasyon bellekte tutulsun.
+# Bu sınırdan önce başlayan sorgular DB'ye düşer (eski tarihler nadiren sorgulanır).
+SEAT_INDEX_LOOKBACK_HOURS = float(os.getenv("SEAT_INDEX_LOOKBACK_HOURS", "24"))
+# Canlı olay akışı yokken indeks en fazla bu kadar saniye eski kullanılır; sweeper yarı sürede bir yeniden yükler
+SEAT_INDEX_MAX_AGE = float(os.getenv("SEAT_INDEX_MAX_AGE", "30"))
+# Canlı olay akışı varken tam yükleme sadece süresi dolan kayıtları atmak ve ufku ilerletmek için
+SEAT_INDEX_LIVE_RELOAD_INTERVAL = float(os.getenv("SEAT_INDEX_LIVE_RELOAD_INTERVAL", "300"))
+
+LOAD_QUERY = text("""
+    SELECT reservation_id, spot_id, seat_number, start_time, end_time
+    FROM reservations
+    WHERE status != 'İPTAL' AND end_time >= :horizon
+      AND start_time > CAST(:horizon AS TIMESTAMP) - INTERVAL '24 hours'
+      AND spot_id IS NOT NULL AND seat_number IS NOT NULL
+""")
+
+LOAD_SPOT_QUERY = text("""
+    SELECT reservation_id, spot_id, seat_number, start_time, end_time
+    FROM reservations
+    WHERE status != 'İPTAL' AND end_time >= :horizon AND spot_id = :sid
+      AND start_time > CAST(:horizon AS TIMESTAMP) - INTERVAL '24 hours'
+      AND seat_number IS NOT NULL
+""")
+
+
+def parse_ts(value):
+    """
+    Frontend'den gelen '2023-12-01T14:00:00' / '2023-12-01 14:00:00' formatlarını çözer.
+    DB kolonları TIMESTAMP (timezone'suz) olduğu için tz bilgisi Postgres gibi atılır.
+    Çözülemezse None döner, çağıran taraf DB yoluna düşer.
+    """
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class _SeatTimeline:
+    """Tek bir koltuğun başlangıca göre sıralı aralıkları (+ prefix max bitiş)."""
+
+    __slots__ = ("starts", "entries", "max_ends")
+
+    def __init__(self):
+        self.starts = []    # sıralı başlangıçlar (bisect için)
+        self.entries = []   # (start, end, reservation_id) aynı sırada
+        self.max_ends = []  # max_ends[i] = entries[0..i] içindeki en geç bitiş
+
+    def _rebuild_max(self, frm: int):
+        running = self.max_ends[frm - 1] if frm > 0 else None
+        del self.max_ends[frm:]
+        for _, end, _ in self.entries[frm:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def add(self, start, end, rid):
+        entry = (start, end, rid)
+        pos = bisect_left(self.entries, entry)
+        self.entries.insert(pos, entry)
+        self.starts.insert(pos, start)
+        self._rebuild_max(pos)
+
+    def remove(self, start, end, rid):
+        pos = bisect_left(self.entries, (start, end, rid))
+        if pos < len(self.entries) and self.entries[pos][2] == rid:
+            del self.entries[pos]
+            del self.starts[pos]
+            self._rebuild_max(pos)
+
+    def overlaps(self, start, end) -> bool:
+        # start < :end olan aralıklar [0, i) -> içlerinden biri start'tan sonra bitiyor mu?
+        i = bisect_left(self.starts, end)
+        return i > 0 and self.max_ends[i - 1] > start
+
+
+class SeatIntervalIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._spots = {}        # spot_id -> {seat_number -> _SeatTimeline}
+        self._by_id = {}        # reservation_id -> (spot_id, seat, start, end)
+        self._horizon = None    # bu andan önce başlayan sorgular indekste değil
+        self._pending = None    # reload sırasında gelen yazmalar (reload bitince tekrar uygulanır)
+        self._loaded_at = None  # son tam yüklemenin sorgu anı (monotonic)
+        self._live = False      # LISTEN açık ve son tam yükleme o bağlantı açıldıktan sonra yapıldı
+        self.ready = False
+
+    # --- Tazelik ---
+    def set_live(self, live: bool):
+        # live.py: dinleyici bağlandıktan (ve ardından yapılan tam yüklemeden) sonra True, koptuğunda False
+        self._live = live
+
+    def age(self):
+        return None if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    def fresh(self) -> bool:
+        age = self.age()
+        return self._live or (age is not None and age < SEAT_INDEX_MAX_AGE)
+
+    def refresh_due(self) -> bool:
+        age = self.age()
+        if age is None:
+            return True
+        return age >= (SEAT_INDEX_LIVE_RELOAD_INTERVAL if self._live else SEAT_INDEX_MAX_AGE / 2)
+
+    # --- Okuma ---
+    def covers(self, start) -> bool:
+        return self.ready and start is not None and start >= self._horizon and self.fresh()
+
+    def occupied_seats(self, spot_id: int, start, end):
+        with self._lock:
+            seats = self._spots.get(spot_id, {})
+            return sorted(seat for seat, tl in seats.items() if tl.overlaps(start, end))
+
+    def is_occupied(self, spot_id: int, seat: int, start, end) -> bool:
+        with self._lock:
+            tl = self._spots.get(spot_id, {}).get(seat)
+            return tl is not None and tl.overlaps(start, end)
+
+    # --- Yazma (DB commit'inden SONRA çağrılır) ---
+    def _add(self, rid, spot_id, seat, start, end):
+        if rid in self._by_id or spot_id is None or seat is None:
+            return
+        self._by_id[rid] = (spot_id, seat, start, end)
+        self._spots.setdefault(spot_id, {}).setdefault(seat, _SeatTimeline()).add(start, end, rid)
+
+    def _remove(self, rid):
+        item = self._by_id.pop(rid, None)
+        if item:
+            spot_id, seat, start, end = item
+            self._spots[spot_id][seat].remove(start, end, rid)
+
+    def add(self, rid: int, spot_id: int, seat: int, start, end):
+        start, end = parse_ts(start), parse_ts(end)
+        if start is None or end is None:
+            return
+        with self._lock:
+            self._add(rid, spot_id, seat, start, end)
+            if self._pending is not None:
+                self._pending.append(("add", rid, spot_id, seat, start, end))
+
+    def remove(self, rid: int):
+        with self._lock:
+            self._remove(rid)
+            if self._pending is not None:
+                self._pending.append(("remove", rid))
+
+    def drop_spot(self, spot_id: int):
+        with self._lock:
+            for seats in self._spots.pop(spot_id, {}).values():
+                for _, _, rid in seats.entries:
+                    self._by_id.pop(rid, None)
+
+    def reload_spot(self, db, spot_id: int):
+        """Bakım trigger'ı gibi toplu değişikliklerden sonra tek mekanı DB'den tazeler."""
+        if not self.ready:
+            return
+        rows = db.execute(LOAD_SPOT_QUERY, {"sid": spot_id, "horizon": self._horizon}).fetchall()
+        with self._lock:
+            self.drop_spot(spot_id)
+            for row in rows:
+                self._add(row.reservation_id, row.spot_id, row.seat_number, row.start_time, row.end_time)
+
+    # --- Tam yükleme ---
+    def load(self, db):
+        """
+        İndeksi DB'den baştan kurar (başlangıçta ve sweeper ile periyodik).
+        Periyodik yenileme hem süresi dolan kayıtları atar hem de diğer worker'ların
+        yazmalarını içeri alır. Yükleme sırasında gelen yazmalar kaybolmasın diye kaydedilip
+        yeni indekse tekrar uygulanır.
+        """
+        horizon = datetime.now() - timedelta(hours=SEAT_INDEX_LOOKBACK_HOURS)
+        started_at = time.monotonic()
+        with self._lock:
+            self._pending = []
+        try:
+            rows = db.execute(LOAD_QUERY, {"horizon": horizon}).fetchall()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        fresh = SeatIntervalIndex()
+        for row in rows:
+            fresh._add(row.reservation_id, row.spot_id, row.seat_number, row.start_time, row.end_time)
+
+        with self._lock:
+            for op in self._pending:
+                if op[0] == "add":
+                    fresh._add(*op[1:])
+                else:
+                    fresh._remove(op[1])
+            self._spots, self._by_id = fresh._spots, fresh._by_id
+            self._horizon = horizon
+            self._loaded_at = started_at
+            self._pending = None
+            self.ready = True
+
+
+seat_index = SeatIntervalIndex()
+
+
+def refresh_seat_index():
+    # Başlangıçta, LISTEN bağlantısı açılınca ve sweeper döngüsünde çağrılır.
+    # DB'ye ulaşılamazsa indeks eskir ve endpoint'ler DB yoluna düşer.
+    db = SessionLocal()
+    try:
+        seat_index.load(db)
+    except Exception as e:
+        print(f"Seat index yüklenemedi: {e}")
+    finally:
+        db.close()
+
+
+def maybe_refresh_seat_index():
+    # Sweeper döngüsünden çağrılır; indeks henüz eskimediyse bir şey yapmaz
+    if seat_index.refresh_due():
+        refresh_seat_index()
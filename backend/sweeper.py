@@ -0,0 +1,89 @@
+# sweeper.py
+# Süresi dolan AKTİF rezervasyonları arka planda TAMAMLANDI'ya çeken görev.
+# Eskiden bu UPDATE okuma endpoint'lerinin içinde her istekte çalışıyordu (satır kilidi + WAL).
+# Artık okuma endpoint'leri sadece "effective status" hesaplıyor, kalıcı güncelleme burada yapılıyor.
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from seat_index import maybe_refresh_seat_index
+from admin_stats import maybe_refresh_admin_stats
+from partitions import maybe_ensure_partitions
+from heatmap import maybe_fold_spot_occupancy
+
+# Kaç saniyede bir tarama yapılacak (0 veya negatif -> kapalı)
+STATUS_SWEEP_INTERVAL = float(os.getenv("STATUS_SWEEP_INTERVAL", "60"))
+# Arka plan döngüsünün uyanma aralığı. Her iş kendi aralığı dolunca çalışır; tarama kapalı olsa da
+# koltuk indeksi, istatistik ve partition işleri çalışmaya devam eder.
+SWEEPER_TICK_SECONDS = float(os.getenv("SWEEPER_TICK_SECONDS", "5"))
+
+# Okurken kullanılan "etkin durum": bitiş saati geçmiş AKTİF kayıt TAMAMLANDI sayılır.
+# Sweeper henüz çalışmamış olsa bile kullanıcı doğru durumu görür.
+def effective_status_sql(alias: str = "r") -> str:
+    return (
+        f"CASE WHEN {alias}.status = 'AKTİF' AND {alias}.end_time < NOW() "
+        f"THEN 'TAMAMLANDI' ELSE {alias}.status END"
+    )
+
+# start_time < NOW() gereksiz görünür (end_time > start_time) ama gelecek ayların partition'larını budar
+EXPIRE_QUERY = text(
+    "UPDATE reservations SET status = 'TAMAMLANDI' "
+    "WHERE end_time < NOW() AND start_time < NOW() AND status = 'AKTİF'"
+)
+
+_stop_event = threading.Event()
+_thread = None
+_last_sweep = time.monotonic()
+
+
+def sweep_expired_reservations() -> int:
+    """Tek seferlik tarama. Güncellenen satır sayısını döndürür."""
+    db = SessionLocal()
+    try:
+        result = db.execute(EXPIRE_QUERY)
+        db.commit()
+        return result.rowcount
+    except Exception as e:
+        db.rollback()
+        print(f"Status sweeper hatası: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+def maybe_sweep_expired_reservations():
+    global _last_sweep
+    if STATUS_SWEEP_INTERVAL > 0 and time.monotonic() - _last_sweep >= STATUS_SWEEP_INTERVAL:
+        sweep_expired_reservations()
+        _last_sweep = time.monotonic()
+
+
+def _run():
+    while not _stop_event.wait(SWEEPER_TICK_SECONDS):
+        maybe_sweep_expired_reservations()
+        # İndeks eskidiyse: süresi dolan aralıkları at, diğer worker'ların yazmalarını içeri al
+        maybe_refresh_seat_index()
+        # Dashboard istatistik görüntüsü (ADMIN_STATS_REFRESH_INTERVAL dolduysa)
+        maybe_refresh_admin_stats()
+        # Gelecek ayların reservations partition'ları (RESERVATION_PARTITION_CHECK_INTERVAL dolduysa)
+        maybe_ensure_partitions()
+        # Doluluk değişikliklerini heatmap özetine katla (SPOT_OCCUPANCY_FOLD_INTERVAL dolduysa)
+        maybe_fold_spot_occupancy()
+
+
+def start_status_sweeper():
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop_event.clear()
+    _thread = threading.Thread(target=_run, name="status-sweeper", daemon=True)
+    _thread.start()
+
+
+def stop_status_sweeper():
+    _stop_event.set()
+    if _thread:
+        _thread.join(timeout=5)
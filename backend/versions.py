@@ -0,0 +1,59 @@
+# versions.py
+# Koşullu GET (ETag / Last-Modified) desteği.
+# Her kaynağın ucuz bir sürüm numarası var: resource_versions tablosu, setup.sql'deki trigger'lar
+# tarafından yazma anında güncellenir. Endpoint önce sadece sürümü okur; istemcinin elindeki
+# sürümle aynıysa ana sorgu hiç çalışmadan 304 döner.
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+VERSIONS_QUERY = text("""
+    SELECT resource, version, updated_at
+    FROM resource_versions
+    WHERE resource = ANY(CAST(:keys AS TEXT[]))
+""")
+
+# Kaynak anahtarları (setup.sql'deki trigger'larla aynı olmalı)
+SPOTS_RESOURCE = "spots"
+USERS_RESOURCE = "users"
+
+
+def spot_reviews_resource(spot_id: int) -> str:
+    return f"reviews:spot:{spot_id}"
+
+
+def user_history_resource(user_id: int) -> str:
+    return f"history:user:{user_id}"
+
+
+async def fetch_version(db, keys: list):
+    """Döner: (etag, last_modified). Hiç yazma görmemiş kaynak 0 sürümündedir."""
+    rows = (await db.execute(VERSIONS_QUERY, {"keys": keys})).fetchall()
+    found = {r.resource: r for r in rows}
+    etag = 'W/"' + "-".join(str(found[k].version) if k in found else "0" for k in keys) + '"'
+    last_modified = max((r.updated_at for r in rows), default=None)
+    return etag, last_modified
+
+
+def is_not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional_response(request: Request, etag: str, last_modified, payload, cache_control: str):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=payload, headers=headers)
@@ -4,11 +4,34 @@
 
 -- 1. TEMİZLİK (Eski tabloları siler, çakışmayı önler)
 DROP TABLE IF EXISTS reviews CASCADE;
+DROP VIEW IF EXISTS reservations_all;
 DROP TABLE IF EXISTS reservations CASCADE;
+DROP TABLE IF EXISTS reservations_archive CASCADE;
 DROP TABLE IF EXISTS study_spots CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
 DROP SEQUENCE IF EXISTS reservation_seq;
 DROP VIEW IF EXISTS admin_dashboard_stats;
+DROP TABLE IF EXISTS admin_stats_history;
+DROP TABLE IF EXISTS resource_versions;
+DROP TABLE IF EXISTS spot_hourly_occupancy;
+DROP TABLE IF EXISTS spot_occupancy_deltas;
+DROP FUNCTION IF EXISTS apply_spot_occupancy(INT, TIMESTAMP, TIMESTAMP, INT);
+DROP TABLE IF EXISTS user_study_totals;
+DROP FUNCTION IF EXISTS get_spot_history(INT);
+DROP SEQUENCE IF EXISTS resource_version_seq;
+DROP FUNCTION IF EXISTS prevent_overlap() CASCADE;
+
+-- Exclusion constraint'te INT sütunları (=) ile tsrange (&&) aynı GiST indekste birleştirmek için
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+-- Trigram indeksi ('%kelime%' aramaları ve benzerlik sıralaması için)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Türkçe duyarlı harf katlama: İ/I/ı -> i, ş -> s, ğ -> g, ü -> u, ö -> o, ç -> c, sonra küçük harf
+-- "kutuphane", "KÜTÜPHANE" ve "Kütüphane" aynı şekilde aranır. (backend/search.py ile aynı kural)
+CREATE OR REPLACE FUNCTION tr_fold(p_text TEXT)
+RETURNS TEXT AS $$
+    SELECT lower(translate(p_text, 'İIıŞşĞğÜüÖöÇç', 'iiissgguuoocc'));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
 
 -- 2. TABLOLAR VE KISITLAR (CONSTRAINTS)
 
@@ -31,7 +54,13 @@ CREATE TABLE study_spots (
     capacity INT CHECK (capacity > 0),
     features TEXT, 
     is_available BOOLEAN DEFAULT TRUE,
-    image_url VARCHAR(255)
+    image_url VARCHAR(255),
+    -- Puan özetleri (reviews tablosundaki trigger ile güncel tutulur, okurken JOIN/AVG gerekmez)
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    rating_hist INT[] NOT NULL DEFAULT '{0,0,0,0,0}', -- [1 yıldız, 2, 3, 4, 5 yıldız] adetleri
+    -- Arama için isim + özellikler, Türkçe katlanmış halde (trigram indeksi bunun üzerinde)
+    search_text TEXT GENERATED ALWAYS AS (tr_fold(name || ' ' || COALESCE(features, ''))) STORED
 );
 
 --SEQUENCE KULLANIMI (Açıkça tanımladık)
@@ -39,8 +68,18 @@ CREATE SEQUENCE reservation_seq START 100 INCREMENT 1;
 
 -- Tablo 3: Rezervasyonlar
 -- Foreign Key + Delete Cascade (Kullanıcı silinirse rezervasyon da gider)
+-- PARTITION: start_time'a göre aylık range partition (reservations_YYYY_MM).
+-- Zaman filtreli sorgular (doluluk, çakışma, geçmiş, sweeper) sadece ilgili ayların partition'larını tarar.
+-- Partition'lar ensure_reservation_partitions() ile önceden açılır; aralık dışı kayıtlar
+-- reservations_default'a düşer ve ilgili ay açıldığında oraya taşınır.
+-- Partition'lı tabloda PRIMARY KEY partition anahtarını (start_time) içermek zorunda.
+-- EXCLUSION CONSTRAINT (no_seat_overlap): Aynı mekanda aynı koltuk için İPTAL olmayan iki rezervasyonun
+-- zaman aralığı (period) çakışamaz. Postgres bunu ana tabloda desteklemediği için her partition'a
+-- ayrı eklenir; ay sınırını aşan çakışmaları trg_cross_partition_overlap yakalar.
+-- chk_reservation_length: en fazla 24 saat -> çakışma sorguları start_time için alt sınır da
+-- verebilir (start_time > aralık başı - 24 saat), böylece eski partition'lar budanır (partition pruning).
 CREATE TABLE reservations (
-    reservation_id INT PRIMARY KEY DEFAULT nextval('reservation_seq'), 
+    reservation_id INT NOT NULL DEFAULT nextval('reservation_seq'), 
     user_id INT REFERENCES users(user_id) ON DELETE CASCADE,
     spot_id INT REFERENCES study_spots(spot_id) ON DELETE SET NULL,
     start_time TIMESTAMP NOT NULL,
@@ -48,8 +87,30 @@ CREATE TABLE reservations (
     seat_number INT,
     status VARCHAR(20) CHECK (status IN ('AKTİF', 'İPTAL', 'TAMAMLANDI')) DEFAULT 'AKTİF',
     has_reviewed BOOLEAN DEFAULT FALSE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    period TSRANGE GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED,
+    CONSTRAINT pk_reservations PRIMARY KEY (reservation_id, start_time),
+    CONSTRAINT chk_reservation_time CHECK (end_time > start_time),
+    CONSTRAINT chk_reservation_length CHECK (end_time - start_time <= INTERVAL '24 hours')
+) PARTITION BY RANGE (start_time);
+
+CREATE TABLE reservations_default PARTITION OF reservations DEFAULT;
+ALTER TABLE reservations_default ADD CONSTRAINT reservations_default_no_seat_overlap EXCLUDE USING gist (
+    spot_id WITH =,
+    seat_number WITH =,
+    period WITH &&
+) WHERE (status <> 'İPTAL');
+
+-- Arşiv: archive_reservation_partitions() eski ayların partition'larını buraya taşır (DETACH + ATTACH,
+-- veri kopyalanmaz). Sıcak tablo küçük kalır; geçmişin tamamı reservations_all view'ı ile okunur.
+CREATE TABLE reservations_archive (
+    LIKE reservations INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED
+) PARTITION BY RANGE (start_time);
+
+CREATE VIEW reservations_all AS
+SELECT * FROM reservations
+UNION ALL
+SELECT * FROM reservations_archive;
 
 -- Tablo 4: Değerlendirmeler (Reviews)
 -- Rating 1-5 arası olmalı
@@ -66,61 +127,375 @@ CREATE TABLE reviews (
 
 -- INDEX (Mekan aramaları hızlansın diye)
 CREATE INDEX idx_spot_name ON study_spots(name);
+-- Baştaki joker karakterli aramalar (LIKE '%q%') btree ile değil trigram GIN indeksi ile çalışır
+CREATE INDEX idx_spot_search_trgm ON study_spots USING gin (search_text gin_trgm_ops);
+
+-- Rezervasyon sorgularına uygun bileşik indeksler
+-- Doluluk / çakışma (spot + zaman aralığı, İPTAL hariç)
+CREATE INDEX idx_res_spot_time ON reservations(spot_id, start_time, end_time) WHERE status <> 'İPTAL';
+-- Kullanıcı geçmişi (/api/my-history: user_id + start_time DESC)
+CREATE INDEX idx_res_user_start ON reservations(user_id, start_time DESC);
+-- Status sweeper (bitişi geçmiş AKTİF kayıtlar)
+CREATE INDEX idx_res_active_end ON reservations(end_time) WHERE status = 'AKTİF';
+-- Admin listeleri keyset sayfalama (ORDER BY ... DESC, id DESC)
+CREATE INDEX idx_res_start_id ON reservations(start_time DESC, reservation_id DESC);
+-- Mekan geçmişi keyset sayfalama (/api/spots/{id}/history)
+CREATE INDEX idx_res_spot_start_id ON reservations(spot_id, start_time DESC, reservation_id DESC);
+CREATE INDEX idx_reviews_created_id ON reviews(created_at DESC, review_id DESC);
 
 --  VIEW (Admin Dashboard İstatistikleri)
 CREATE OR REPLACE VIEW admin_dashboard_stats AS
 SELECT 
-    (SELECT COUNT(*) FROM reservations WHERE status = 'AKTİF') as active_reservations,
+    -- Bitiş saati geçmiş AKTİF kayıtlar sayılmaz (status sweeper henüz güncellememiş olabilir)
+    (SELECT COUNT(*) FROM reservations WHERE status = 'AKTİF' AND end_time >= NOW()) as active_reservations,
     (SELECT COUNT(*) FROM study_spots WHERE is_available = TRUE) as available_spots,
+    -- Mekan ortalamalarının ortalaması (study_spots üzerindeki özet sütunlardan, reviews taranmaz)
     (
-        SELECT COALESCE(AVG(sub.avg_rating), 0)::NUMERIC(10,2)
-        FROM (
-            SELECT AVG(rating) as avg_rating
-            FROM reviews
-            GROUP BY spot_id
-        ) sub
+        SELECT COALESCE(AVG(rating_sum::NUMERIC / rating_count), 0)::NUMERIC(10,2)
+        FROM study_spots
+        WHERE rating_count > 0
     ) as average_site_rating,
     (SELECT COUNT(*) FROM users WHERE role = 'STUDENT') as total_students;
 
+-- Dashboard istatistik anlık görüntüleri (saatlik kovalar)
+-- View her çağrıda tabloları tarar; AdminPanel ise en son görüntüyü okur.
+-- Her kova o saat içindeki SON görüntüyü tutar -> aynı tablo hem "şu an" hem trend geçmişi.
+CREATE TABLE admin_stats_history (
+    bucket TIMESTAMP PRIMARY KEY,          -- date_trunc('hour', ...)
+    computed_at TIMESTAMP NOT NULL,        -- görüntünün alındığı an (bayatlık hesabı için)
+    active_reservations BIGINT NOT NULL,
+    available_spots BIGINT NOT NULL,
+    average_site_rating NUMERIC(10,2) NOT NULL,
+    total_students BIGINT NOT NULL
+);
+
+-- Saatlik doluluk özeti (heatmap / kapasite planlama)
+-- Mekan başına her saat kovasında dolu koltuk-dakika toplamı; ham tablo taranmaz.
+-- İPTAL olmayan tüm kayıtlar sayılır (AKTİF -> TAMAMLANDI geçişi özeti değiştirmez).
+-- Rezervasyon yazmaları özeti doğrudan güncellemez: trg_spot_occupancy sadece spot_occupancy_deltas'a
+-- satır ekler (paylaşılan kova satırı kilitlenmez), sweeper fold_spot_occupancy() ile özete katlar.
+-- Yeniden hesaplama: SELECT rebuild_spot_occupancy();  (veya: python backend/manage.py rebuild-heatmap)
+CREATE TABLE spot_hourly_occupancy (
+    spot_id INT NOT NULL,
+    bucket TIMESTAMP NOT NULL,             -- date_trunc('hour', ...)
+    seat_minutes INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (spot_id, bucket)
+);
+-- Tüm mekanlar için tarih aralığı okuması (heatmap endpoint'i)
+CREATE INDEX idx_occupancy_bucket ON spot_hourly_occupancy(bucket) INCLUDE (spot_id, seat_minutes);
+
+-- Özete henüz işlenmemiş rezervasyon değişiklikleri (sadece INSERT; sign: 1 eklendi, -1 çıkarıldı)
+CREATE TABLE spot_occupancy_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    spot_id INT NOT NULL,
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    sign SMALLINT NOT NULL
+);
+
+-- Kullanıcı başına tamamlanmış çalışma süresi (çalışma saati / liderlik tablosu)
+-- trg_user_study_totals kayıt TAMAMLANDI'ya geçtiğinde (veya çıktığında) artımlı günceller.
+-- Bitişi geçmiş ama sweeper'ın henüz çekmediği AKTİF kayıtlar okurken ayrıca eklenir (get_study_hours).
+-- Yeniden hesaplama: SELECT rebuild_user_study_totals();  (veya: python backend/manage.py rebuild-study-hours)
+CREATE TABLE user_study_totals (
+    user_id INT PRIMARY KEY,
+    completed_seconds BIGINT NOT NULL DEFAULT 0
+);
+
+-- Kaynak sürümleri (Koşullu GET / ETag için)
+-- Trigger'lar yazma anında ilgili kaynağın sürümünü artırır, API ana sorguyu çalıştırmadan
+-- sadece buradan sürüm okuyup 304 Not Modified dönebilir.
+-- Anahtarlar: 'spots', 'users', 'reviews:spot:<id>', 'history:user:<id>'
+CREATE SEQUENCE resource_version_seq;
+CREATE TABLE resource_versions (
+    resource VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 -- 4. FONKSİYONLAR (STORED PROCEDURES)
 
--- CURSOR ve RECORD Kullanımı
--- Mekanın geçmiş rezervasyonlarını listeler
-CREATE OR REPLACE FUNCTION get_spot_history(p_spot_id INT)
-RETURNS TABLE(r_user VARCHAR, r_start TIMESTAMP, r_status VARCHAR) AS $$
-DECLARE
-    rec RECORD;
-    cur_reservations CURSOR FOR 
-        SELECT u.username, r.start_time, r.status 
+-- Kaynak sürümünü artır (yoksa oluştur)
+CREATE OR REPLACE FUNCTION bump_resource_version(p_resource TEXT)
+RETURNS VOID AS $$
+    INSERT INTO resource_versions (resource, version, updated_at)
+    VALUES (p_resource, nextval('resource_version_seq'), NOW())
+    ON CONFLICT (resource) DO UPDATE SET version = EXCLUDED.version, updated_at = EXCLUDED.updated_at;
+$$ LANGUAGE sql;
+
+-- Dashboard görüntüsünü yeniler (backend'deki sweeper periyodik çağırır)
+CREATE OR REPLACE FUNCTION refresh_admin_stats()
+RETURNS VOID AS $$
+    INSERT INTO admin_stats_history
+        (bucket, computed_at, active_reservations, available_spots, average_site_rating, total_students)
+    SELECT date_trunc('hour', NOW()), NOW(),
+           v.active_reservations, v.available_spots, v.average_site_rating, v.total_students
+    FROM admin_dashboard_stats v
+    ON CONFLICT (bucket) DO UPDATE SET
+        computed_at = EXCLUDED.computed_at,
+        active_reservations = EXCLUDED.active_reservations,
+        available_spots = EXCLUDED.available_spots,
+        average_site_rating = EXCLUDED.average_site_rating,
+        total_students = EXCLUDED.total_students;
+$$ LANGUAGE sql;
+
+-- Mekanın geçmiş rezervasyonlarını listeler (yeniden eskiye)
+-- Eskiden CURSOR ile satır satır RETURN NEXT yapıyordu (sırasız, limitsiz). Artık tek sorgu:
+-- planner inline edip idx_res_spot_start_id üzerinden ilk p_limit satırı okur.
+-- Keyset sayfalama: bir önceki sayfanın son (r_start, r_id) değeri p_before_start / p_before_id olarak verilir.
+-- p_from / p_to: start_time aralığı [p_from, p_to)
+CREATE OR REPLACE FUNCTION get_spot_history(
+    p_spot_id INT,
+    p_from TIMESTAMP DEFAULT NULL,
+    p_to TIMESTAMP DEFAULT NULL,
+    p_before_start TIMESTAMP DEFAULT NULL,
+    p_before_id INT DEFAULT NULL,
+    p_limit INT DEFAULT NULL
+)
+RETURNS TABLE(r_id INT, r_user VARCHAR, r_start TIMESTAMP, r_status VARCHAR) AS $$
+    SELECT r.reservation_id, u.username, r.start_time,
+           CASE WHEN r.status = 'AKTİF' AND r.end_time < NOW() THEN 'TAMAMLANDI' ELSE r.status END
+    FROM reservations_all r
+    JOIN users u ON r.user_id = u.user_id
+    WHERE r.spot_id = p_spot_id
+      AND (p_from IS NULL OR r.start_time >= p_from)
+      AND (p_to IS NULL OR r.start_time < p_to)
+      AND (p_before_start IS NULL OR (r.start_time, r.reservation_id) < (p_before_start, p_before_id))
+    ORDER BY r.start_time DESC, r.reservation_id DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Çok kullanıcılı çalışma saati (toplu sorgu / liderlik tablosu)
+-- user_study_totals + bitişi geçmiş ama henüz TAMAMLANDI'ya çekilmemiş AKTİF kayıtlar.
+-- p_user_ids NULL -> tüm kullanıcılar
+CREATE OR REPLACE FUNCTION get_study_hours(p_user_ids INT[] DEFAULT NULL)
+RETURNS TABLE(r_user_id INT, r_username VARCHAR, r_hours FLOAT) AS $$
+    SELECT u.user_id, u.username,
+           (COALESCE(t.completed_seconds, 0) + COALESCE(p.seconds, 0)) / 3600.0
+    FROM users u
+    LEFT JOIN user_study_totals t ON t.user_id = u.user_id
+    LEFT JOIN (
+        SELECT r.user_id, SUM(EXTRACT(EPOCH FROM (r.end_time - r.start_time))::BIGINT) AS seconds
         FROM reservations r
-        JOIN users u ON r.user_id = u.user_id
-        WHERE r.spot_id = p_spot_id;
+        WHERE r.status = 'AKTİF' AND r.end_time < NOW() AND r.start_time < NOW()
+          AND (p_user_ids IS NULL OR r.user_id = ANY(p_user_ids))
+        GROUP BY r.user_id
+    ) p ON p.user_id = u.user_id
+    WHERE p_user_ids IS NULL OR u.user_id = ANY(p_user_ids);
+$$ LANGUAGE sql STABLE;
+
+-- Parametre alan ve hesap yapan fonksiyon
+-- Kullanıcının toplam çalışma saatini hesaplar (tek kullanıcılık get_study_hours)
+CREATE OR REPLACE FUNCTION calculate_study_hours(p_user_id INT)
+RETURNS FLOAT AS $$
+    SELECT COALESCE((SELECT r_hours FROM get_study_hours(ARRAY[p_user_id])), 0);
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION apply_user_study_seconds(p_user_id INT, p_seconds BIGINT)
+RETURNS VOID AS $$
+    INSERT INTO user_study_totals AS t (user_id, completed_seconds)
+    VALUES (p_user_id, p_seconds)
+    ON CONFLICT (user_id) DO UPDATE SET completed_seconds = t.completed_seconds + EXCLUDED.completed_seconds;
+$$ LANGUAGE sql;
+
+-- Toplamları reservations_all'dan (arşiv dahil) baştan hesaplar. Yazılan kullanıcı sayısını döndürür.
+CREATE OR REPLACE FUNCTION rebuild_user_study_totals()
+RETURNS INT AS $$
+DECLARE
+    user_count INT;
+BEGIN
+    TRUNCATE user_study_totals;
+    INSERT INTO user_study_totals (user_id, completed_seconds)
+    SELECT user_id, SUM(EXTRACT(EPOCH FROM (end_time - start_time))::BIGINT)
+    FROM reservations_all
+    WHERE status = 'TAMAMLANDI' AND user_id IS NOT NULL
+    GROUP BY user_id;
+    GET DIAGNOSTICS user_count = ROW_COUNT;
+    RETURN user_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Puan özetlerini reviews tablosundan baştan hesaplar (kayma/drift düzeltme)
+-- Sadece farklı olan satırları günceller, düzeltilen mekan sayısını döndürür.
+-- Kullanım: SELECT rebuild_spot_rating_stats();  (veya: python backend/manage.py rebuild-ratings)
+CREATE OR REPLACE FUNCTION rebuild_spot_rating_stats()
+RETURNS INT AS $$
+DECLARE
+    fixed_count INT;
+BEGIN
+    UPDATE study_spots s
+    SET rating_sum = agg.rating_sum,
+        rating_count = agg.rating_count,
+        rating_hist = agg.rating_hist
+    FROM (
+        SELECT sp.spot_id,
+               COALESCE(SUM(r.rating), 0)::INT AS rating_sum,
+               COUNT(r.rating)::INT AS rating_count,
+               ARRAY[
+                   COUNT(*) FILTER (WHERE r.rating = 1),
+                   COUNT(*) FILTER (WHERE r.rating = 2),
+                   COUNT(*) FILTER (WHERE r.rating = 3),
+                   COUNT(*) FILTER (WHERE r.rating = 4),
+                   COUNT(*) FILTER (WHERE r.rating = 5)
+               ]::INT[] AS rating_hist
+        FROM study_spots sp
+        LEFT JOIN reviews r ON r.spot_id = sp.spot_id
+        GROUP BY sp.spot_id
+    ) agg
+    WHERE s.spot_id = agg.spot_id
+      AND (s.rating_sum, s.rating_count, s.rating_hist)
+          IS DISTINCT FROM (agg.rating_sum, agg.rating_count, agg.rating_hist);
+    GET DIAGNOSTICS fixed_count = ROW_COUNT;
+    RETURN fixed_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bir [p_start, p_end) aralığının saat kovaları ve her kovadaki dakikası (tek satırlık SQL -> planlayıcı inline eder)
+CREATE OR REPLACE FUNCTION occupancy_buckets(p_start TIMESTAMP, p_end TIMESTAMP)
+RETURNS TABLE (bucket TIMESTAMP, minutes INT) AS $$
+    SELECT h, (EXTRACT(EPOCH FROM (LEAST(p_end, h + INTERVAL '1 hour') - GREATEST(p_start, h))) / 60)::INT
+    FROM generate_series(date_trunc('hour', p_start), p_end - INTERVAL '1 microsecond', INTERVAL '1 hour') h
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Biriken değişiklikleri özete katlar, katlanan değişiklik sayısını döndürür (sweeper çağırır).
+-- Aynı anda tek katlama çalışır; kovalar sabit sırada (spot_id, bucket) güncellenir.
+-- DELETE sadece bu ifadenin gördüğü satırları alır: katlama sürerken eklenen değişiklikler sonrakine kalır.
+CREATE OR REPLACE FUNCTION fold_spot_occupancy()
+RETURNS INT AS $$
+DECLARE
+    folded INT;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('fold_spot_occupancy')) THEN
+        RETURN 0;
+    END IF;
+    WITH moved AS (
+        DELETE FROM spot_occupancy_deltas RETURNING spot_id, start_time, end_time, sign
+    ), upserted AS (
+        INSERT INTO spot_hourly_occupancy AS o (spot_id, bucket, seat_minutes)
+        SELECT m.spot_id, b.bucket, SUM(m.sign * b.minutes)
+        FROM moved m
+        CROSS JOIN LATERAL occupancy_buckets(m.start_time, m.end_time) b
+        GROUP BY m.spot_id, b.bucket
+        ORDER BY m.spot_id, b.bucket
+        ON CONFLICT (spot_id, bucket) DO UPDATE SET seat_minutes = o.seat_minutes + EXCLUDED.seat_minutes
+    )
+    SELECT COUNT(*) INTO folded FROM moved;
+    RETURN folded;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Özeti reservations_all'dan (arşiv dahil) baştan hesaplar. Yazılan kova sayısını döndürür.
+CREATE OR REPLACE FUNCTION rebuild_spot_occupancy()
+RETURNS INT AS $$
+DECLARE
+    bucket_count INT;
+BEGIN
+    -- Bekleyen değişiklikler de sıfırlanır: TRUNCATE, yazma transaction'larının bitmesini bekler,
+    -- aşağıdaki tarama onların sonucunu zaten içerir.
+    TRUNCATE spot_hourly_occupancy, spot_occupancy_deltas;
+    INSERT INTO spot_hourly_occupancy (spot_id, bucket, seat_minutes)
+    SELECT r.spot_id, b.bucket, SUM(b.minutes)
+    FROM reservations_all r
+    CROSS JOIN LATERAL occupancy_buckets(r.start_time, r.end_time) b
+    WHERE r.status <> 'İPTAL' AND r.spot_id IS NOT NULL
+    GROUP BY r.spot_id, b.bucket;
+    GET DIAGNOSTICS bucket_count = ROW_COUNT;
+    RETURN bucket_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- PARTITION YÖNETİMİ
+-- Tek bir ayın partition'ını açar (varsa dokunmaz). O aya ait kayıtlar reservations_default'ta
+-- birikmişse önce yeni tabloya taşınır, sonra ATTACH edilir. Açıldıysa TRUE döner.
+CREATE OR REPLACE FUNCTION create_reservation_partition(p_month DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    lo TIMESTAMP := date_trunc('month', p_month);
+    hi TIMESTAMP := date_trunc('month', p_month) + INTERVAL '1 month';
+    part_name TEXT := 'reservations_' || to_char(p_month, 'YYYY_MM');
+BEGIN
+    -- Arşive taşınmış aylar da aynı isimle durur, yeniden açılmaz
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE reservations INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)',
+        part_name);
+    EXECUTE format(
+        'ALTER TABLE %I ADD CONSTRAINT %I EXCLUDE USING gist (spot_id WITH =, seat_number WITH =, period WITH &&) '
+        'WHERE (status <> %L)', part_name, part_name || '_no_seat_overlap', 'İPTAL');
+    -- Taşıma default'tan DELETE + bağlanmamış tabloya INSERT: özet trigger'ı sadece DELETE'i görür, atlansın
+    PERFORM set_config('studyflow.moving_partition', 'on', true);
+    EXECUTE format(
+        'WITH moved AS ('
+        '    DELETE FROM reservations_default WHERE start_time >= $1 AND start_time < $2'
+        '    RETURNING reservation_id, user_id, spot_id, start_time, end_time, seat_number, status, has_reviewed, created_at'
+        ') INSERT INTO %I (reservation_id, user_id, spot_id, start_time, end_time, seat_number, status, has_reviewed, created_at) '
+        'SELECT * FROM moved', part_name) USING lo, hi;
+    PERFORM set_config('studyflow.moving_partition', 'off', true);
+    EXECUTE format('ALTER TABLE reservations ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part_name, lo, hi);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bu aydan itibaren p_months_ahead ay sonrasına kadar partition'ları açar; default partition'da
+-- birikmiş ayları da kendi partition'larına taşır. Açılan partition sayısını döndürür.
+-- Kullanım: SELECT ensure_reservation_partitions(12);  (veya: python backend/manage.py ensure-partitions)
+-- Backend bunu açılışta ve periyodik olarak (sweeper) çağırır.
+CREATE OR REPLACE FUNCTION ensure_reservation_partitions(p_months_ahead INT DEFAULT 12)
+RETURNS INT AS $$
+DECLARE
+    m DATE;
+    created INT := 0;
 BEGIN
-    OPEN cur_reservations;
+    FOR m IN
+        SELECT generate_series(date_trunc('month', NOW()),
+                               date_trunc('month', NOW()) + make_interval(months => p_months_ahead),
+                               INTERVAL '1 month')::DATE
+        UNION
+        SELECT DISTINCT date_trunc('month', start_time)::DATE FROM reservations_default
+        ORDER BY 1
     LOOP
-        FETCH cur_reservations INTO rec;
-        EXIT WHEN NOT FOUND;
-        r_user := rec.username;
-        r_start := rec.start_time;
-        r_status := rec.status;
-        RETURN NEXT;
+        IF create_reservation_partition(m) THEN
+            created := created + 1;
+        END IF;
     END LOOP;
-    CLOSE cur_reservations;
+    RETURN created;
 END;
 $$ LANGUAGE plpgsql;
 
--- Parametre alan ve hesap yapan fonksiyon
--- Kullanıcının toplam çalışma saatini hesaplar
-CREATE OR REPLACE FUNCTION calculate_study_hours(p_user_id INT)
-RETURNS FLOAT AS $$
+-- ARŞİVLEME: p_keep_months aydan eski partition'ları reservations'dan ayırıp reservations_archive'a bağlar.
+-- Sadece katalog işlemi (satır kopyalanmaz). p_drop_cancelled -> arşivlenen aylardaki İPTAL kayıtlar silinir
+-- (sıkıştırma; ardından VACUUM FULL ile dosya küçültülebilir, manage.py bunu yapar).
+-- Arşivlenen partition isimlerini döndürür.
+CREATE OR REPLACE FUNCTION archive_reservation_partitions(p_keep_months INT, p_drop_cancelled BOOLEAN DEFAULT FALSE)
+RETURNS SETOF TEXT AS $$
 DECLARE
-    total_hours FLOAT;
+    part RECORD;
+    cutoff DATE := date_trunc('month', NOW()) - make_interval(months => p_keep_months);
+    lo TIMESTAMP;
 BEGIN
-    SELECT COALESCE(SUM(EXTRACT(EPOCH FROM (end_time - start_time))/3600), 0)
-    INTO total_hours
-    FROM reservations
-    WHERE user_id = p_user_id AND status = 'TAMAMLANDI';
-    RETURN total_hours;
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'reservations'::regclass
+          AND c.relname ~ '^reservations_[0-9]{4}_[0-9]{2}$'
+        ORDER BY c.relname
+    LOOP
+        lo := to_date(substr(part.relname, 14), 'YYYY_MM');
+        CONTINUE WHEN lo + INTERVAL '1 month' > cutoff;
+        -- Arşivdeki kayıtlar kesinleşmiş olsun (sweeper'ın kaçırdığı AKTİF'ler; trigger'lar hâlâ çalışırken)
+        EXECUTE format('UPDATE %I SET status = %L WHERE status = %L AND end_time < NOW()',
+                       part.relname, 'TAMAMLANDI', 'AKTİF');
+        EXECUTE format('ALTER TABLE reservations DETACH PARTITION %I', part.relname);
+        IF p_drop_cancelled THEN
+            EXECUTE format('DELETE FROM %I WHERE status = %L', part.relname, 'İPTAL');
+        END IF;
+        EXECUTE format('ALTER TABLE reservations_archive ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                       part.relname, lo, lo + INTERVAL '1 month');
+        RETURN NEXT part.relname;
+    END LOOP;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -136,7 +511,8 @@ BEGIN
     WHERE spot_id = p_spot_id 
       AND seat_number = p_seat_number -- Koltuk kontrolü eklendi
       AND status != 'İPTAL'
-      AND (start_time, end_time) OVERLAPS (p_start, p_end);
+      AND (start_time, end_time) OVERLAPS (p_start, p_end)
+      AND start_time > p_start - INTERVAL '24 hours'; -- partition pruning (en fazla 24 saatlik rezervasyon)
       
     IF conflict_count > 0 THEN 
         RETURN FALSE; -- Çakışma var, müsait değil
@@ -148,26 +524,186 @@ $$ LANGUAGE plpgsql;
 
 -- 5. TRIGGERLAR (TETİKLEYİCİLER)
 
--- TRIGGER 1 (Çakışma Kontrolü - Before Insert)
-CREATE OR REPLACE FUNCTION prevent_overlap()
+-- (Eski TRIGGER 1 - prevent_overlap / trg_check_overlap kaldırıldı)
+-- Çakışma kontrolü artık reservations tablosundaki no_seat_overlap EXCLUSION CONSTRAINT ile yapılıyor.
+-- Çakışan INSERT, SQLSTATE 23P01 (exclusion_violation) hatası verir, backend bunu 409'a çevirir.
+
+-- TRIGGER 1B (Partition'lar arası çakışma kontrolü)
+-- no_seat_overlap her partition'da ayrı olduğu için ay sınırına değen rezervasyonlar (örn. 31 Ocak 23:00 -
+-- 1 Şubat 01:00) komşu partition'daki kayıtlarla çakışabilir. Sadece sınıra yakın satırlarda (ayın ilk
+-- 24 saati içinde başlayan veya sonraki aya taşan) koltuk bazlı advisory lock alınıp komşu aylara bakılır;
+-- çakışma varsa constraint ile aynı hata (23P01, no_seat_overlap) verilir.
+CREATE OR REPLACE FUNCTION check_cross_partition_overlap()
 RETURNS TRIGGER AS $$
+DECLARE
+    lo TIMESTAMP := date_trunc('month', NEW.start_time);
+    hi TIMESTAMP := date_trunc('month', NEW.start_time) + INTERVAL '1 month';
 BEGIN
-    IF NOT check_availability(NEW.spot_id, NEW.start_time, NEW.end_time) THEN
-        RAISE EXCEPTION 'Bu saat aralığında bu mekan dolu! (Trigger Hatası)';
+    IF NEW.status = 'İPTAL' OR NEW.spot_id IS NULL OR NEW.seat_number IS NULL THEN
+        RETURN NEW;
+    END IF;
+    -- UPDATE'te sadece koltuk/aralık değiştiyse veya iptal geri alındıysa kontrol gerekir.
+    -- Sweeper'ın AKTİF -> TAMAMLANDI ve arşiv güncellemeleri kilit almadan geçer.
+    IF TG_OP = 'UPDATE'
+       AND NEW.spot_id = OLD.spot_id AND NEW.seat_number = OLD.seat_number
+       AND NEW.start_time = OLD.start_time AND NEW.end_time = OLD.end_time
+       AND OLD.status IS DISTINCT FROM 'İPTAL' THEN
+        RETURN NEW;
+    END IF;
+    IF NEW.start_time >= lo + INTERVAL '24 hours' AND NEW.end_time <= hi THEN
+        RETURN NEW;
+    END IF;
+    -- Aynı koltuğa sınırın iki yanından gelen eşzamanlı INSERT'ler sıraya girer
+    PERFORM pg_advisory_xact_lock(NEW.spot_id, NEW.seat_number);
+    IF EXISTS (
+        SELECT 1 FROM reservations r
+        WHERE r.spot_id = NEW.spot_id
+          AND r.seat_number = NEW.seat_number
+          AND r.status <> 'İPTAL'
+          AND r.start_time > NEW.start_time - INTERVAL '24 hours'
+          AND r.start_time < NEW.end_time
+          AND (r.start_time < lo OR r.start_time >= hi)
+          AND r.end_time > NEW.start_time
+          AND r.reservation_id <> NEW.reservation_id
+    ) THEN
+        RAISE EXCEPTION 'Koltuk % bu saatlerde dolu (ay sınırında çakışma).', NEW.seat_number
+            USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'no_seat_overlap';
     END IF;
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trg_check_overlap
-BEFORE INSERT ON reservations
+CREATE TRIGGER trg_cross_partition_overlap
+BEFORE INSERT OR UPDATE OF spot_id, seat_number, start_time, end_time, status ON reservations
+FOR EACH ROW
+EXECUTE FUNCTION check_cross_partition_overlap();
+
+-- TRIGGER 1C (Saatlik doluluk özeti)
+-- Eski satırın katkısı çıkarılır, yenisininki eklenir. Sadece sayılan alanlar değiştiyse çalışır
+-- (sweeper'ın AKTİF -> TAMAMLANDI güncellemesi özeti değiştirmez).
+-- Rezervasyon transaction'ı sadece spot_occupancy_deltas'a ekleme yapar: aynı mekan/saate düşen
+-- rezervasyonlar ortak kova satırını kilitleyip birbirini beklemez, toplu eklemeler kilitlenmez (deadlock).
+CREATE OR REPLACE FUNCTION update_spot_occupancy()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('studyflow.moving_partition', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE'
+       AND (OLD.status = 'İPTAL') = (NEW.status = 'İPTAL')
+       AND OLD.spot_id IS NOT DISTINCT FROM NEW.spot_id
+       AND OLD.start_time = NEW.start_time AND OLD.end_time = NEW.end_time THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status <> 'İPTAL' AND OLD.spot_id IS NOT NULL THEN
+        INSERT INTO spot_occupancy_deltas (spot_id, start_time, end_time, sign)
+        VALUES (OLD.spot_id, OLD.start_time, OLD.end_time, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status <> 'İPTAL' AND NEW.spot_id IS NOT NULL THEN
+        INSERT INTO spot_occupancy_deltas (spot_id, start_time, end_time, sign)
+        VALUES (NEW.spot_id, NEW.start_time, NEW.end_time, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_spot_occupancy
+AFTER INSERT OR UPDATE OR DELETE ON reservations
+FOR EACH ROW
+EXECUTE FUNCTION update_spot_occupancy();
+
+-- TRIGGER 1D (Kullanıcı çalışma süresi toplamı)
+-- TAMAMLANDI kaydın süresi sayılır; eski satırın katkısı çıkarılır, yenisininki eklenir.
+CREATE OR REPLACE FUNCTION update_user_study_totals()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('studyflow.moving_partition', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE'
+       AND (OLD.status = 'TAMAMLANDI') = (NEW.status = 'TAMAMLANDI')
+       AND (OLD.status <> 'TAMAMLANDI'
+            OR (OLD.user_id IS NOT DISTINCT FROM NEW.user_id
+                AND OLD.start_time = NEW.start_time AND OLD.end_time = NEW.end_time)) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'TAMAMLANDI' AND OLD.user_id IS NOT NULL THEN
+        PERFORM apply_user_study_seconds(OLD.user_id, -EXTRACT(EPOCH FROM (OLD.end_time - OLD.start_time))::BIGINT);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'TAMAMLANDI' AND NEW.user_id IS NOT NULL THEN
+        PERFORM apply_user_study_seconds(NEW.user_id, EXTRACT(EPOCH FROM (NEW.end_time - NEW.start_time))::BIGINT);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_user_study_totals
+AFTER INSERT OR UPDATE OR DELETE ON reservations
+FOR EACH ROW
+EXECUTE FUNCTION update_user_study_totals();
+
+-- TRIGGER 1E (Canlı doluluk olayları)
+-- Doluluğu değiştiren her yazma 'seat_events' kanalına NOTIFY edilir (commit anında teslim edilir,
+-- rollback olursa hiç gönderilmez). Backend worker'ları LISTEN edip kendi koltuk indekslerini günceller
+-- ve /api/spots/{id}/occupancy/stream abonelerine iletir. AKTİF -> TAMAMLANDI geçişi doluluğu değiştirmez.
+CREATE OR REPLACE FUNCTION notify_seat_events()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('studyflow.moving_partition', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE'
+       AND (OLD.status = 'İPTAL') = (NEW.status = 'İPTAL')
+       AND OLD.spot_id IS NOT DISTINCT FROM NEW.spot_id
+       AND OLD.seat_number IS NOT DISTINCT FROM NEW.seat_number
+       AND OLD.start_time = NEW.start_time AND OLD.end_time = NEW.end_time THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status <> 'İPTAL'
+       AND OLD.spot_id IS NOT NULL AND OLD.seat_number IS NOT NULL THEN
+        PERFORM pg_notify('seat_events', json_build_object(
+            'op', 'remove', 'id', OLD.reservation_id, 'spot', OLD.spot_id, 'seat', OLD.seat_number,
+            'start', OLD.start_time, 'end', OLD.end_time)::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status <> 'İPTAL'
+       AND NEW.spot_id IS NOT NULL AND NEW.seat_number IS NOT NULL THEN
+        PERFORM pg_notify('seat_events', json_build_object(
+            'op', 'add', 'id', NEW.reservation_id, 'spot', NEW.spot_id, 'seat', NEW.seat_number,
+            'start', NEW.start_time, 'end', NEW.end_time)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_seat_events
+AFTER INSERT OR UPDATE OR DELETE ON reservations
 FOR EACH ROW
-EXECUTE FUNCTION prevent_overlap();
+EXECUTE FUNCTION notify_seat_events();
+
+-- Mekan bakıma alındı / açıldı (iptal edilen rezervasyonlar ayrıca 'remove' olarak gelir)
+CREATE OR REPLACE FUNCTION notify_spot_availability()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('seat_events', json_build_object(
+        'op', 'spot', 'spot', NEW.spot_id, 'available', NEW.is_available)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_spot_availability_events
+AFTER UPDATE OF is_available ON study_spots
+FOR EACH ROW
+WHEN (OLD.is_available IS DISTINCT FROM NEW.is_available)
+EXECUTE FUNCTION notify_spot_availability();
 
 -- TRIGGER 2 (Mekan Bakıma Alındığında - Otomatik Rezervasyonları İptal Et)
 -- Mantık: is_available FALSE'a çekildiğinde o mekanın tüm AKTİF rezervasyonlarını İPTAL'e çek
+-- İptal edilen kayıt sayısı transaction'a özel 'studyflow.maintenance_cancelled' ayarına yazılır;
+-- backend bakım UPDATE'inin RETURNING kısmında aynı ifade içinde okur (ayrıca COUNT sorgusu atmaz).
 CREATE OR REPLACE FUNCTION auto_cancel_on_maintenance()
 RETURNS TRIGGER AS $$
+DECLARE
+    cancelled_count INT := 0;
 BEGIN
     -- Eğer mekan aktiften (TRUE) pasife (FALSE) değiştiriliyorsa
     IF OLD.is_available = TRUE AND NEW.is_available = FALSE THEN
@@ -176,16 +712,117 @@ BEGIN
         SET status = 'İPTAL'
         WHERE spot_id = NEW.spot_id
         AND status = 'AKTİF';
+        GET DIAGNOSTICS cancelled_count = ROW_COUNT;
     END IF;
+    PERFORM set_config('studyflow.maintenance_cancelled', cancelled_count::TEXT, true);
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
+-- Sadece is_available değişen UPDATE'lerde çalışır (puan özeti güncellemeleri tetiklemez)
 CREATE TRIGGER trg_auto_cancel_maintenance
-BEFORE UPDATE ON study_spots
+BEFORE UPDATE OF is_available ON study_spots
 FOR EACH ROW
 EXECUTE FUNCTION auto_cancel_on_maintenance();
 
+-- TRIGGER 3 (Puan Özetleri - reviews INSERT/DELETE/UPDATE sonrası)
+-- study_spots.rating_sum / rating_count / rating_hist artımlı olarak güncellenir
+CREATE OR REPLACE FUNCTION maintain_spot_rating_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.spot_id IS NOT NULL AND OLD.rating IS NOT NULL THEN
+        UPDATE study_spots
+        SET rating_sum = rating_sum - OLD.rating,
+            rating_count = rating_count - 1,
+            rating_hist[OLD.rating] = rating_hist[OLD.rating] - 1
+        WHERE spot_id = OLD.spot_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.spot_id IS NOT NULL AND NEW.rating IS NOT NULL THEN
+        UPDATE study_spots
+        SET rating_sum = rating_sum + NEW.rating,
+            rating_count = rating_count + 1,
+            rating_hist[NEW.rating] = rating_hist[NEW.rating] + 1
+        WHERE spot_id = NEW.spot_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_spot_rating_stats
+AFTER INSERT OR DELETE OR UPDATE OF rating, spot_id ON reviews
+FOR EACH ROW
+EXECUTE FUNCTION maintain_spot_rating_stats();
+
+-- TRIGGER 4 (Kaynak Sürümleri - Koşullu GET)
+-- study_spots: ifade (statement) bazlı, toplu güncellemede tek artış
+CREATE OR REPLACE FUNCTION bump_spots_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_resource_version('spots');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_spots_version
+AFTER INSERT OR UPDATE OR DELETE ON study_spots
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_spots_version();
+
+-- users: kullanıcı adı yorum listelerinde görünüyor
+CREATE OR REPLACE FUNCTION bump_users_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_resource_version('users');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_users_version
+AFTER UPDATE OF username ON users
+FOR EACH STATEMENT
+EXECUTE FUNCTION bump_users_version();
+
+-- reviews: mekan bazlı sürüm
+CREATE OR REPLACE FUNCTION bump_reviews_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.spot_id IS NOT NULL THEN
+        PERFORM bump_resource_version('reviews:spot:' || OLD.spot_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.spot_id IS NOT NULL
+       AND (TG_OP = 'INSERT' OR NEW.spot_id IS DISTINCT FROM OLD.spot_id) THEN
+        PERFORM bump_resource_version('reviews:spot:' || NEW.spot_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_reviews_version
+AFTER INSERT OR UPDATE OR DELETE ON reviews
+FOR EACH ROW
+EXECUTE FUNCTION bump_reviews_version();
+
+-- reservations: kullanıcı bazlı sürüm (/api/my-history)
+-- Kullanıcı başına ayrı satır -> farklı kullanıcıların rezervasyonları aynı satırı kilitlemez
+CREATE OR REPLACE FUNCTION bump_history_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.user_id IS NOT NULL THEN
+        PERFORM bump_resource_version('history:user:' || OLD.user_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.user_id IS NOT NULL
+       AND (TG_OP = 'INSERT' OR NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+        PERFORM bump_resource_version('history:user:' || NEW.user_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_history_version
+AFTER INSERT OR UPDATE OR DELETE ON reservations
+FOR EACH ROW
+EXECUTE FUNCTION bump_history_version();
+
 -- 6. VERİ DOLDURMA (SEED DATA - Her tabloya 10 Kayıt)
 
 -- USERS (10 Kayıt)
@@ -227,6 +864,9 @@ INSERT INTO reservations (user_id, spot_id, start_time, end_time, seat_number, s
 (9, 8, '2023-12-08 10:00:00', '2023-12-08 11:00:00', 1, 'TAMAMLANDI'),
 (10, 9, '2023-12-09 09:00:00', '2023-12-09 18:00:00', 2, 'AKTİF');
 
+-- Bu ay + 12 ay partition'ları; yukarıdaki eski tarihli kayıtlar default'tan kendi aylarına taşınır
+SELECT ensure_reservation_partitions(12);
+
 -- REVIEWS (10 Kayıt)
 INSERT INTO reviews (user_id, spot_id, rating, comment) VALUES
 (1, 1, 5, 'Çok verimli geçti.'),
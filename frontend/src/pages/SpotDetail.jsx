@@ -49,27 +49,31 @@ const SpotDetail = () => {
     }, [id]);
 
     useEffect(() => {
-        const checkAvailability = async () => {
-            if (selectedDate && startHour && endHour) {
-                try {
-                    // startHour "14:00" gibi gelmeli. Eğer dropdown sadece "14" dönüyorsa formatla.
-                    // Bizim kodda "14:00" formatında olduğu için direkt gönderiyoruz.
-                    const occupied = await Service.getOccupiedSeats(id, selectedDate, startHour, endHour);
-                    setOccupiedSeats(occupied);
-
-                    // Eğer seçili koltuk artık doluysa, seçimi kaldır
-                    if (selectedSeat && occupied.includes(selectedSeat)) {
-                        setSelectedSeat(null);
-                        alert("Seçtiğiniz saat aralığında bu koltuk maalesef dolu.");
-                    }
-                } catch (error) {
-                    console.error("Dolu koltuklar çekilemedi", error);
-                }
-            }
-        };
-        checkAvailability();
+        if (!(selectedDate && startHour && endHour)) return;
+
+        // startHour "14:00" gibi gelmeli. Eğer dropdown sadece "14" dönüyorsa formatla.
+        // Bizim kodda "14:00" formatında olduğu için direkt gönderiyoruz.
+        // Seçili pencere için canlı akış: başka biri rezervasyon yaptığında / iptal ettiğinde anında güncellenir.
+        const unsubscribe = Service.subscribeOccupiedSeats(id, selectedDate, startHour, endHour, {
+            onSnapshot: (occupied) => setOccupiedSeats(occupied),
+            onDelta: ({ occupied, released }) => {
+                setOccupiedSeats((prev) => prev.filter((s) => !released.includes(s)).concat(occupied));
+            },
+            onSpot: ({ available }) => {
+                setSpot((prev) => (prev ? { ...prev, isAvailable: available } : prev));
+            },
+        });
+        return unsubscribe;
     }, [selectedDate, startHour, endHour, id]);
 
+    // Eğer seçili koltuk artık doluysa, seçimi kaldır
+    useEffect(() => {
+        if (selectedSeat && occupiedSeats.includes(selectedSeat)) {
+            setSelectedSeat(null);
+            alert("Seçtiğiniz saat aralığında bu koltuk maalesef dolu.");
+        }
+    }, [occupiedSeats]);
+
     const handleReserve = async () => {
         if (!user) return alert("Lütfen giriş yapın.");
         if (!selectedSeat) return alert("Lütfen oturmak istediğiniz koltuğu seçin!");
@@ -88,6 +92,8 @@ const SpotDetail = () => {
                 seatNumber: selectedSeat // <--- ARTIK KOLTUK NO GÖNDERİYORUZ
             });
 
+            // Kendi rezervasyonumuz canlı akıştan "dolu" olarak dönünce uyarı çıkmasın
+            setSelectedSeat(null);
             alert("Rezervasyon Başarılı!");
             navigate('/my-reservations');
         } catch (error) {
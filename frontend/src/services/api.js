@@ -11,6 +11,22 @@ const api = axios.create({
     },
 });
 
+// Read-your-writes: yazma yanıtındaki transaction id'si saklanır ve sonraki isteklere eklenir.
+// Backend, okuma replikası bu transaction'ı henüz görmüyorsa isteği primary'den okur (rezervasyon sonrası geçmiş hemen görünür).
+const READ_AFTER_HEADER = 'X-Read-After';
+
+api.interceptors.request.use((config) => {
+    const readAfter = sessionStorage.getItem(READ_AFTER_HEADER);
+    if (readAfter) config.headers[READ_AFTER_HEADER] = readAfter;
+    return config;
+});
+
+api.interceptors.response.use((response) => {
+    const readAfter = response.headers[READ_AFTER_HEADER.toLowerCase()];
+    if (readAfter) sessionStorage.setItem(READ_AFTER_HEADER, readAfter);
+    return response;
+});
+
 // --- TÜM API İSTEKLERİ BURADA ---
 
 export const Service = {
@@ -131,12 +147,23 @@ export const Service = {
         return response.data;
     },
 
+    // Canlı doluluk (Server-Sent Events): önce tam liste (snapshot), sonra sadece değişiklikler (delta).
+    // Bağlantı koparsa EventSource kendisi yeniden bağlanır ve yeni bir snapshot gelir.
+    // Dönen fonksiyon aboneliği kapatır.
+    subscribeOccupiedSeats: (spotId, date, start, end, { onSnapshot, onDelta, onSpot }) => {
+        const source = new EventSource(`${API_URL}/spots/${spotId}/occupancy/stream?date=${date}&start=${start}&end=${end}`);
+        source.addEventListener('snapshot', (e) => onSnapshot(JSON.parse(e.data).occupied));
+        source.addEventListener('delta', (e) => onDelta(JSON.parse(e.data)));
+        if (onSpot) source.addEventListener('spot', (e) => onSpot(JSON.parse(e.data)));
+        return () => source.close();
+    },
+
     // --- SQL FONKSİYONLARI KULLANAN ÇAĞRILAR ---
 
-    // 1. SQL FONKSİYON: get_spot_history (CURSOR ve RECORD kullanıyor)
-    getSpotHistory: async (spotId) => {
-        const response = await api.get(`/spots/${spotId}/history`);
-        return response.data;
+    // 1. SQL FONKSİYON: get_spot_history (set tabanlı, keyset sayfalı - son `limit` kayıt)
+    getSpotHistory: async (spotId, limit = 50) => {
+        const response = await api.get(`/spots/${spotId}/history?limit=${limit}`);
+        return response.data.items;
     },
 
     // 2. SQL FONKSİYON: calculate_study_hours (Parametre alan hesaplama)